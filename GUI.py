@@ -1,7 +1,8 @@
 import sys
 from PyQt6 import QtWidgets, QtGui, QtCore
-from Graph import Graph
-from Sorting import Sorter, InsertionSortStrategy, chinese_to_pinyin_initials
+from Graph import get_graph_service
+from Sorting import Sorter, SortedView, chinese_to_pinyin_initials
+from Search import SubstringIndex, PinyinTrie
 from openai import OpenAI
 import threading
 import ast
@@ -46,12 +47,13 @@ def update_scenery_visit_count(scenery_name, file_path):
 
 
 # 读取文件信息
-def load_scenery_info(file_path):
+def load_scenery_info(file_path, with_initials=False):
     """
     从txt文件中读取详细景点信息，并返回以景点名称为键的字典。
     每行格式示例：
     "大观园正门", "金陵十二钗影壁所在地", ["入口","标志性建筑","影视取景"], 120,0
     或带有可选花签词的情况。
+    with_initials 为 True 时同时预先计算名称的拼音首字母，保存在 "initials" 字段中。
     """
     scenery_dict = {}
     try:
@@ -78,6 +80,8 @@ def load_scenery_info(file_path):
                         "visit_count": visit_count,
                         "flower": flower,
                     }
+                    if with_initials:
+                        scenery_dict[name]["initials"] = chinese_to_pinyin_initials(name)
                 except Exception as e:
                     print("解析景点记录失败:", line, e)
         return scenery_dict
@@ -86,6 +90,70 @@ def load_scenery_info(file_path):
         return {}
 
 
+# 搜索对话框的排序方式 -> (排序字段, 是否降序)
+SORT_OPTIONS = {
+    "名称升序": ("initials", False),
+    "名称降序": ("initials", True),
+    "热度升序": ("popularity", False),
+    "热度降序": ("popularity", True),
+    "游览人数升序": ("visit_count", False),
+    "游览人数降序": ("visit_count", True),
+}
+
+
+# 搜索对话框共用的景点列表：景点信息只读取一次，子串索引和拼音前缀树只建一次，
+# 每种排序方式对应一个长期存在的有序视图，首次使用时排序一次；
+# 浏览人数增加时由 record_visit 把该景点在各视图中移到新位置，不必整体重排
+class SceneryListing:
+    def __init__(self, file_path):
+        self.by_name = load_scenery_info(file_path, with_initials=True)
+        self.attractions = list(self.by_name.values())
+        # 名称和简介的子串索引，边输入边搜索时不必逐条扫描
+        self.text_index = SubstringIndex(self.attractions)
+        # 拼音首字母和全拼前缀树，支持输入 "xxg" 查找潇湘馆
+        self.pinyin_index = PinyinTrie(self.attractions, score_field="popularity")
+        self.views = {}
+
+    def view(self, sort_option):
+        view = self.views.get(sort_option)
+        if view is None:
+            field, reverse = SORT_OPTIONS.get(sort_option, ("initials", False))
+            view = SortedView(Sorter(key=lambda a: a[field], reverse=reverse), self.attractions)
+            self.views[sort_option] = view
+        return view
+
+    def search(self, search_text, sort_option):
+        view = self.view(sort_option)
+        if not search_text:
+            return list(view)
+        matched = {id(a): a for a in self.text_index.search(search_text)}
+        if search_text.isascii() and search_text.isalpha():
+            # 拼音只取热度最高的前 k 个，直接读取前缀树节点缓存的结果，不遍历整个子树
+            pinyin_matches = self.pinyin_index.search(search_text, self.pinyin_index.k)
+            matched.update((id(a), a) for a in pinyin_matches)
+        # 只按命中记录在视图中的位置排序（每条 O(log n)），不扫描整个视图
+        return sorted(matched.values(), key=view.index)
+
+    def record_visit(self, name):
+        record = self.by_name.get(name)
+        if record is None:
+            return
+        record["visit_count"] += 1
+        for view in self.views.values():
+            view.update(record)
+
+
+_scenery_listing = None
+
+
+# 返回进程内共用的景点列表，首次调用时读取 SceneryDetail.txt
+def get_scenery_listing():
+    global _scenery_listing
+    if _scenery_listing is None:
+        _scenery_listing = SceneryListing("SceneryDetail.txt")
+    return _scenery_listing
+
+
 # 地图显示部件
 class Map(QtWidgets.QWidget):
     def __init__(self):
@@ -264,8 +332,10 @@ class SceneryInfoDialog(QtWidgets.QDialog):
 
         # 获取景点名称
         name = info.get("name", "")
-        # 更新文件中对应景点的浏览人数（每次显示时+1）
+        # 更新文件中对应景点的浏览人数（每次显示时+1），同时更新搜索用的有序视图
+        listing = get_scenery_listing()
         update_scenery_visit_count(name, "Scenerydetail.txt")
+        listing.record_visit(name)
 
         # 重新加载详细景点信息（假设文件格式参考 :contentReference[oaicite:1]{index=1}）
         scenery_details = load_scenery_info("SceneryDetail.txt")
@@ -306,20 +376,11 @@ class SearchDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("搜索景点")
         self.resize(400, 300)
-        self.attractions = []
-        # 读取详细景点信息，文件为“SceneryDetail.txt”
-        self.loadattractions("SceneryDetail.txt")
+        # 景点信息、索引和各排序方式的有序视图在多次打开对话框之间共用（见 SceneryListing）
+        self.listing = get_scenery_listing()
+        self.attractions = self.listing.attractions
         self.initUI()
 
-    def loadattractions(self, filename):
-        try:
-            # 调用上面定义的 load_scenery_info 解析详细信息
-            scenery_details = load_scenery_info(filename)
-            # 将字典的值转为列表存入 attractions 中
-            self.attractions = list(scenery_details.values())
-        except Exception as e:
-            print("读取文件错误:", e)
-
     def initUI(self):
         layout = QtWidgets.QVBoxLayout(self)
         self.search_line = QtWidgets.QLineEdit(self)
@@ -327,11 +388,7 @@ class SearchDialog(QtWidgets.QDialog):
         layout.addWidget(self.search_line)
 
         self.sort_combo = QtWidgets.QComboBox(self)
-        self.sort_combo.addItems([
-            "名称升序", "名称降序",
-            "热度升序", "热度降序",
-            "游览人数升序", "游览人数降序"
-        ])
+        self.sort_combo.addItems(list(SORT_OPTIONS))
         layout.addWidget(self.sort_combo)
 
         self.list_widget = QtWidgets.QListWidget(self)
@@ -353,32 +410,7 @@ class SearchDialog(QtWidgets.QDialog):
     def updateList(self):
         search_text = self.search_line.text().strip()
         sort_option = self.sort_combo.currentText()
-        if sort_option == "名称升序":
-            key_func = lambda a: chinese_to_pinyin_initials(a["name"])
-            reverse = False
-        elif sort_option == "名称降序":
-            key_func = lambda a: chinese_to_pinyin_initials(a["name"])
-            reverse = True
-        elif sort_option == "热度升序":
-            key_func = lambda a: a["popularity"]
-            reverse = False
-        elif sort_option == "热度降序":
-            key_func = lambda a: a["popularity"]
-            reverse = True
-        elif sort_option == "游览人数升序":
-            key_func = lambda a: a["visit_count"]
-            reverse = False
-        elif sort_option == "游览人数降序":
-            key_func = lambda a: a["visit_count"]
-            reverse = True
-        else:
-            key_func = lambda a: chinese_to_pinyin_initials(a["name"])
-            reverse = False
-
-        filtered = [a for a in self.attractions if
-                    search_text.lower() in a["name"].lower()] if search_text else self.attractions[:]
-        sorter = Sorter(strategy=InsertionSortStrategy(), key=key_func, reverse=reverse)
-        filtered = sorter.sort(filtered)
+        filtered = self.listing.search(search_text, sort_option)
         self.list_widget.clear()
         for a in filtered:
             # 此处显示名称、热度和浏览人数（visit_count）
@@ -467,16 +499,81 @@ class ShortestRoutePlanDialog(QtWidgets.QDialog):
         layout.addWidget(button_box)
 
 
+# 限时游览：选择起点、终点和可用时间，规划热度最高的游览路线
+class BudgetTourDialog(QtWidgets.QDialog):
+    def __init__(self, attractions, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("限时游览")
+        self.setFixedSize(300, 180)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        form_layout = QtWidgets.QFormLayout()
+        self.start_combo = QtWidgets.QComboBox()
+        self.start_combo.addItems(attractions)
+        self.end_combo = QtWidgets.QComboBox()
+        self.end_combo.addItems(attractions)
+        self.budget_spin = QtWidgets.QSpinBox()
+        self.budget_spin.setRange(10, 600)
+        self.budget_spin.setSingleStep(10)
+        self.budget_spin.setValue(60)
+        self.budget_spin.setSuffix(" 分钟")
+        form_layout.addRow("起点:", self.start_combo)
+        form_layout.addRow("终点:", self.end_combo)
+        form_layout.addRow("可用时间:", self.budget_spin)
+        layout.addLayout(form_layout)
+
+        button_box = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok | QtWidgets.QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+
+# 图构建完成后设置景点热度和地图坐标
+def setup_route_graph(graph):
+    scenery_details = load_scenery_info("SceneryDetail.txt")
+    graph.set_popularity({name: d["popularity"] for name, d in scenery_details.items()})
+    graph.load_positions("SceneryPosition.txt")
+
+
 # 主窗口
 class MainWindow(QtWidgets.QMainWindow):
+    # 后台线程完成路线计算后，通过该信号把 (回调函数, 结果) 送回主线程处理
+    task_finished = QtCore.pyqtSignal(object, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("地图程序")
         self.resize(1200, 715)
+        # 全程序共享的路线规划服务，启动时在后台预热，各对话框不再各自重建图
+        self.route_service = get_graph_service(setup=setup_route_graph)
+        self.route_service.warm_up()
+        self.task_finished.connect(self.on_task_finished)
         self.createToolBar()
         self.map_widget = Map()
         self.setCentralWidget(self.map_widget)
 
+    # 在后台线程中执行 compute，完成后在主线程中调用 on_done(结果)
+    def run_in_background(self, compute, on_done):
+        def worker():
+            try:
+                result = compute()
+            except Exception as e:
+                print("路线计算失败:", e)
+                result = None
+            self.task_finished.emit(on_done, result)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_task_finished(self, on_done, result):
+        on_done(result)
+
+    # 在地图上绘制路线，一段时间后清除
+    def show_path_on_map(self, path):
+        self.map_widget.current_path = path
+        self.map_widget.update()
+        # 5秒后清除
+        QtCore.QTimer.singleShot(6480, lambda: self.map_widget.clear_path())
+
     def createToolBar(self):
         toolbar = QtWidgets.QToolBar("工具栏")
         toolbar.setMovable(False)
@@ -511,6 +608,10 @@ class MainWindow(QtWidgets.QMainWindow):
         visit_route_action.triggered.connect(self.plan_visit_route)
         toolbar.addAction(visit_route_action)
 
+        budget_tour_action = QtGui.QAction("限时游览", self)
+        budget_tour_action.triggered.connect(self.plan_budget_tour)
+        toolbar.addAction(budget_tour_action)
+
         ai_action = QtGui.QAction("AI问答", self)
         ai_action.triggered.connect(self.show_ai_dialog)
         toolbar.addAction(ai_action)
@@ -550,9 +651,7 @@ class MainWindow(QtWidgets.QMainWindow):
     # 最短路径规划
     def plan_shortest_route(self):
         from PyQt6.QtWidgets import QMessageBox
-        graph = Graph()
-        graph.create_graph()
-        attractions = list(graph.vertex_time.keys())
+        attractions = self.route_service.attractions()
         dialog = ShortestRoutePlanDialog(attractions, self)
         if dialog.exec() == QtWidgets.QDialog.DialogCode.Accepted:
             start = dialog.start_combo.currentText()
@@ -560,26 +659,20 @@ class MainWindow(QtWidgets.QMainWindow):
             if start == target:
                 QMessageBox.warning(self, "输入错误", "起点与终点不能相同！")
                 return
-            path, time_val = graph.get_shortest_route(start, target)
+            path, time_val = self.route_service.get_shortest_route(start, target)
             if path is None:
                 QMessageBox.information(self, "结果", f"从 {start} 到 {target} 无法找到路径。")
             else:
                 QMessageBox.information(self, "路线规划结果",
                                         f"最短路径：{' -> '.join(path)}\n总旅行时间：{time_val} 分钟")
-                # 在地图上绘制
-                self.map_widget.current_path = path
-                self.map_widget.update()
-                # 5秒后清除
-                QtCore.QTimer.singleShot(6480, lambda: self.map_widget.clear_path())
+                self.show_path_on_map(path)
         else:
             print("最短路线规划取消")
 
     # 游览路径规划
     def plan_visit_route(self):
         from PyQt6.QtWidgets import QMessageBox
-        graph = Graph()
-        graph.create_graph()
-        all_attractions = list(graph.vertex_time.keys())
+        all_attractions = self.route_service.attractions()
         dialog = SightseeingRouteDialog(all_attractions, self)
         if dialog.exec() == QtWidgets.QDialog.DialogCode.Accepted:
             required, start, end = dialog.get_selection()
@@ -589,22 +682,48 @@ class MainWindow(QtWidgets.QMainWindow):
             if start not in required or end not in required:
                 QMessageBox.warning(self, "输入错误", "起点和终点必须在必经景点中。")
                 return
-            path, times = graph.get_visit_path(required, start=start, end=end)
-            if not path:
-                QMessageBox.information(self, "结果", "无法规划出满足条件的游览路线。")
-            else:
-                travel_time, visit_time, total_time = times
-                QMessageBox.information(self, "路径规划结果",
-                                        f"游览路线：{' -> '.join(path)}\n旅行时间：{travel_time} 分钟\n游玩时长：{visit_time} 分钟\n总计：{total_time} 分钟")
-                # 在地图上绘制
-                self.map_widget.current_path = path
-                self.map_widget.update()
-                # 5秒后清除
-                QtCore.QTimer.singleShot(6480, lambda: self.map_widget.clear_path())
 
+            def show_visit_route(result):
+                path, times, optimal = result if result else (None, None, False)
+                if not path:
+                    QMessageBox.information(self, "结果", "无法规划出满足条件的游览路线。")
+                else:
+                    travel_time, visit_time, total_time = times
+                    note = "" if optimal else "\n（必经景点较多，当前为近似最优路线）"
+                    QMessageBox.information(self, "路径规划结果",
+                                            f"游览路线：{' -> '.join(path)}\n旅行时间：{travel_time} 分钟\n游玩时长：{visit_time} 分钟\n总计：{total_time} 分钟{note}")
+                    self.show_path_on_map(path)
+
+            self.run_in_background(lambda: self.route_service.plan_visit_path(required, start=start, end=end),
+                                   show_visit_route)
         else:
             print("游览规划取消")
 
+    # 限时游览规划
+    def plan_budget_tour(self):
+        from PyQt6.QtWidgets import QMessageBox
+        attractions = self.route_service.attractions()
+        dialog = BudgetTourDialog(attractions, self)
+        if dialog.exec() == QtWidgets.QDialog.DialogCode.Accepted:
+            start = dialog.start_combo.currentText()
+            end = dialog.end_combo.currentText()
+            budget = dialog.budget_spin.value()
+
+            def show_budget_tour(result):
+                path, times, stops, _ = result if result else (None, None, None, False)
+                if not path:
+                    QMessageBox.information(self, "结果", f"{budget} 分钟内无法从 {start} 到达 {end}。")
+                else:
+                    travel_time, visit_time, total_time = times
+                    QMessageBox.information(self, "限时游览结果",
+                                            f"游玩景点：{'、'.join(stops) if stops else '无'}\n游览路线：{' -> '.join(path)}\n旅行时间：{travel_time} 分钟\n游玩时长：{visit_time} 分钟\n总计：{total_time} 分钟")
+                    self.show_path_on_map(path)
+
+            self.run_in_background(lambda: self.route_service.plan_budget_tour(start, end, budget),
+                                   show_budget_tour)
+        else:
+            print("限时游览取消")
+
 
 # 设置 OpenAI API 密钥（请替换成你自己的密钥，或从环境变量中读取）
 client = OpenAI(
@@ -1,8 +1,47 @@
+import csv
 import heapq
 import itertools
+import json
+import math
+import os
+import pickle
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# 必经景点（不含起终点）数量不超过该值时使用 Held-Karp 精确求解，否则使用启发式算法
+HELD_KARP_LIMIT = 13
+# 启发式算法的时间上限（秒）
+HEURISTIC_TIME_LIMIT = 0.3
+# 顶点数不超过该值时预计算全源最短路径矩阵，否则按源点缓存最短路径树
+MATRIX_VERTEX_LIMIT = 1000
+# 最短路径树 LRU 缓存的默认容量（源点个数）
+TREE_CACHE_SIZE = 64
+
+# 限时游览规划的时间上限（秒）以及使用分支限界精确求解的候选景点数上限
+TOUR_TIME_LIMIT = 0.1
+TOUR_EXACT_LIMIT = 24
+
+# 点对点最短路径算法
+ALGORITHM_DIJKSTRA = 'dijkstra'
+ALGORITHM_BIDIRECTIONAL = 'bidirectional'
+ALGORITHM_ASTAR = 'astar'
+
+# 图快照文件格式版本号，快照结构变化时递增
+SNAPSHOT_VERSION = 1
+
+# 设施类别
+FACILITY_TOILET = '厕所'
+FACILITY_EXIT = '出口'
+FACILITY_FOOD = '餐饮'
+FACILITY_FIRST_AID = '急救'
 
 
 class EdgeNode:
+    __slots__ = ('vertex', 'weight', 'next', 'scenic')
+
     def __init__(self, vertex, weight, next=None, scenic=None):
         """
         :param vertex: 边所指向的顶点
@@ -16,19 +55,128 @@ class EdgeNode:
         self.scenic = scenic  # 边上沿路小景点
 
 
+class CSRAdjacency:
+    """
+    冻结的压缩稀疏行（CSR）邻接表示：顶点名被映射为整数编号，
+    顶点 u 的出边为 targets/weights 中下标 offsets[u] 到 offsets[u + 1] - 1 的部分。
+    """
+    __slots__ = ('names', 'index', 'offsets', 'targets', 'weights', 'scenic')
+
+    def __init__(self, names, offsets, targets, weights, scenic=None):
+        """
+        :param names: 顶点名列表，下标即顶点编号
+        :param offsets: 每个顶点出边的起始位置，长度为顶点数 + 1
+        :param targets: 每条边指向的顶点编号
+        :param weights: 每条边的权重（旅行时间）
+        :param scenic: {边下标: 沿途小景点信息}，只保存有小景点的边
+        """
+        self.names = names
+        self.index = {v: i for i, v in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.scenic = scenic or {}
+
+    @classmethod
+    def from_adj_list(cls, adj_list):
+        """
+        由 EdgeNode 链表形式的邻接表构建 CSR，边的顺序与链表遍历顺序一致。
+        """
+        names = list(adj_list)
+        index = {v: i for i, v in enumerate(names)}
+        offsets = array('l', [0])
+        targets = array('l')
+        edge_weights = []
+        scenic = {}
+        for vertex in names:
+            current = adj_list[vertex]
+            while current:
+                if current.scenic:
+                    scenic[len(targets)] = current.scenic
+                targets.append(index[current.vertex])
+                edge_weights.append(current.weight)
+                current = current.next
+            offsets.append(len(targets))
+        # 权重全为整数时使用整型缓冲区，保证路径时间仍以整数返回
+        typecode = 'q' if all(isinstance(w, int) for w in edge_weights) else 'd'
+        return cls(names, offsets, targets, array(typecode, edge_weights), scenic)
+
+    def __len__(self):
+        return len(self.names)
+
+    def edges(self, u):
+        """
+        依次返回顶点 u 的每条出边 (目标顶点编号, 权重, 沿途小景点)。
+        """
+        for e in range(self.offsets[u], self.offsets[u + 1]):
+            yield self.targets[e], self.weights[e], self.scenic.get(e)
+
+    def reversed(self):
+        """
+        构建所有边反向后的 CSR（顶点编号不变），用于反向搜索。
+        """
+        n = len(self.names)
+        offsets = array('l', [0] * (n + 1))
+        for v in self.targets:
+            offsets[v + 1] += 1
+        for u in range(n):
+            offsets[u + 1] += offsets[u]
+        fill = array('l', offsets)
+        targets = array('l', [0] * len(self.targets))
+        weights = array(self.weights.typecode, [0] * len(self.weights))
+        for u in range(n):
+            for e in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[e]
+                targets[fill[v]] = u
+                weights[fill[v]] = self.weights[e]
+                fill[v] += 1
+        return CSRAdjacency(self.names, offsets, targets, weights)
+
+
 class Graph:
-    def __init__(self):
+    def __init__(self, tree_cache_size=TREE_CACHE_SIZE):
         """
         构造函数，初始化图的邻接表和每个顶点的参考游玩时长字典
+
+        :param tree_cache_size: 最短路径树 LRU 缓存最多保存的源点个数
         """
         self.adj_list = {}
         self.vertex_time = {}
+        # 各顶点的热度评分，用于限时游览规划（见 set_popularity）
+        self.vertex_popularity = {}
+        # 由邻接表编译得到的 CSR 表示，所有最短路径算法都在其上运行；frozen 为 True 时链表已被释放
+        self._csr = None
+        self._reverse_csr = None
+        self.frozen = False
+        # 图结构版本号，每次 add_vertex/add_edge 后加一，用于使各种缓存失效
+        self.generation = 0
+        # 全源最短路径矩阵（按顶点下标索引），图结构变化后置为 None，下次查询时重建
+        self._dist_matrix = None
+        self._next_matrix = None
+        # 按源点缓存的最短路径树 {源点下标: (距离列表, 父结点列表)}，用于超过 MATRIX_VERTEX_LIMIT 的大图
+        self.tree_cache_size = tree_cache_size
+        self._tree_cache = OrderedDict()
+        self._tree_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 设施类别 -> 所在顶点集合，如 {'厕所': {...}, '出口': {'南门入口'}}
+        self.facilities = {}
+        # 按类别缓存的反向多源最短路径场 {类别: (版本号, 距离列表, 下一跳列表)}
+        self._facility_fields = {}
+        # 顶点在地图上的像素坐标 {顶点: [(x, y), ...]}（合并顶点可能有多个坐标）及 A* 使用的每像素分钟数
+        self.positions = {}
+        self.minutes_per_pixel = None
 
-    def create_graph(self):
+    def create_graph(self, file_path=None, catalog=None):
         """
         创建图并添加顶点、边以及各顶点的参考游玩时长。
+        指定 file_path 时从数据文件加载（见 load_graph），否则使用下面内置的大观园数据。
         :return: None
         """
+        if file_path is not None:
+            # 矩阵或最短路径树缓存在首次查询时按图的规模（MATRIX_VERTEX_LIMIT）惰性建立
+            self.load_graph(file_path, catalog)
+            return
         vertices = ['南门入口',
             '怡红院',
             '曲径通幽',
@@ -98,7 +246,7 @@ class Graph:
             ('稻香村', '汀花溆'):      {'weight': 10},
             ('稻香村', '暖香坞'):      {'weight': 5},
             ('藕香榭', '暖香坞'):      {'weight': 2},
-            ('汀花淑', '暖香坞'):      {'weight': 10},
+            ('汀花溆', '暖香坞'):      {'weight': 10},
             ('芦雪庵', '藕香榭'):      {'weight': 15},
             ('汀花溆', '蘅芜院'):      {'weight': 5},
             ('凸碧山庄', '蘅芜院'):      {'weight': 5},
@@ -118,23 +266,151 @@ class Graph:
             ('栊翠庵', '林中道观'):      {'weight': 3},
         }
 
+        # 边的端点必须是已声明的顶点，防止名称笔误悄悄生成孤立顶点
+        undeclared = {v for edge in self.edge_info for v in edge} - set(vertices)
+        if undeclared:
+            raise ValueError(f"边引用了未声明的顶点: {sorted(undeclared)}")
+
         # 通过迭代edge_info添加所有边
         for (src, dest), info in self.edge_info.items():
             scenic = info.get('scenic')  # 如果没有scenic信息将返回None
             self.add_edge(src, dest, info['weight'], scenic=scenic)
 
+        # 设置各顶点的设施类别（厕所、出口、餐饮、急救等），新增设施在此登记
+        self.facility_info = {
+            '南门入口': [FACILITY_EXIT],
+        }
+        for vertex, categories in self.facility_info.items():
+            for category in categories:
+                self.add_facility(vertex, category)
+        # 图构建完成后一次性预计算全源最短路径矩阵
+        self.build_distance_matrix()
+
+    def load_graph(self, file_path, catalog=None, freeze=False):
+        """
+        从 CSV 或 JSON 数据文件加载顶点、参考游玩时长、边和设施。
+        CSV 文件逐行流式读取，每行格式为以下之一（以 # 开头的行为注释）：
+            vertex,顶点名,游玩时长
+            edge,起点,终点,权重[,沿途小景点[,directed]]
+            facility,顶点名,设施类别
+        JSON 文件格式为 {"vertices": [{"name", "time"}], "edges": [{"src", "dest", "weight", "scenic", "directed"}],
+        "facilities": {"顶点名": ["类别", ...]}}。
+        边和设施引用的顶点必须已在前面声明；给出 catalog 时，顶点名（合并顶点按 '/' 拆分）必须都在景点目录中。
+
+        :param file_path: 数据文件路径，按扩展名 .csv/.json 区分格式
+        :param catalog: 可选的景点名称集合，用于校验顶点名
+        :param freeze: 加载完成后是否冻结为 CSR 表示（见 freeze）
+        :raises ValueError: 数据行格式错误或引用了未声明/不在目录中的顶点时抛出
+        """
+        if os.path.splitext(file_path)[1].lower() == '.json':
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rows = itertools.chain(
+                (['vertex', v['name'], v.get('time', 0)] for v in data.get('vertices', [])),
+                (['edge', e['src'], e['dest'], e['weight'], e.get('scenic') or '',
+                  'directed' if e.get('directed') else '']
+                 for e in data.get('edges', [])),
+                (['facility', v, c] for v, categories in data.get('facilities', {}).items() for c in categories),
+            )
+            self._load_rows(enumerate(rows, 1), file_path, catalog)
+        else:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                self._load_rows(enumerate(csv.reader(f), 1), file_path, catalog)
+        if freeze:
+            self.freeze()
+
+    def _load_rows(self, rows, file_path, catalog):
+        """
+        逐行把数据加入图中，rows 为 (行号, 字段列表) 的迭代器。
+        """
+        catalog = set(catalog) if catalog is not None else None
+        for line_no, row in rows:
+            if not row or not str(row[0]).strip() or str(row[0]).startswith('#'):
+                continue
+            kind = row[0].strip()
+            try:
+                if kind == 'vertex':
+                    name = row[1].strip()
+                    if catalog is not None and any(part not in catalog for part in name.split('/')):
+                        raise ValueError(f"顶点 {name} 不在景点目录中")
+                    self.add_vertex(name)
+                    self.vertex_time[name] = _number(row[2]) if len(row) > 2 and str(row[2]).strip() else 0
+                elif kind == 'edge':
+                    src, dest = row[1].strip(), row[2].strip()
+                    for v in (src, dest):
+                        if v not in self.adj_list:
+                            raise ValueError(f"边引用了未声明的顶点 {v}")
+                    scenic = row[4].strip() if len(row) > 4 and row[4] else None
+                    directed = len(row) > 5 and str(row[5]).strip() == 'directed'
+                    self.add_edge(src, dest, _number(row[3]), bidirectional=not directed, scenic=scenic)
+                elif kind == 'facility':
+                    name = row[1].strip()
+                    if name not in self.adj_list:
+                        raise ValueError(f"设施引用了未声明的顶点 {name}")
+                    self.add_facility(name, row[2].strip())
+                else:
+                    raise ValueError(f"未知的记录类型 {kind}")
+            except (IndexError, ValueError) as e:
+                raise ValueError(f"{file_path} 第 {line_no} 行: {e}") from e
+
+    def save_snapshot(self, file_path):
+        """
+        把已构建的图（CSR 数组、游玩时长、设施、坐标）写入二进制快照文件，供其他进程快速加载。
+        """
+        csr = self._compiled()
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'names': csr.names,
+            'offsets': csr.offsets,
+            'targets': csr.targets,
+            'weights': csr.weights,
+            'scenic': csr.scenic,
+            'vertex_time': self.vertex_time,
+            'vertex_popularity': self.vertex_popularity,
+            'facilities': self.facilities,
+            'positions': self.positions,
+            'minutes_per_pixel': self.minutes_per_pixel,
+        }
+        with open(file_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load_snapshot(cls, file_path, tree_cache_size=TREE_CACHE_SIZE):
+        """
+        从 save_snapshot 写出的快照文件加载图。加载结果处于冻结（CSR）状态，最短路径矩阵在首次查询时构建。
+        """
+        with open(file_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的图快照版本: {snapshot.get('version')}")
+        graph = cls(tree_cache_size)
+        graph._csr = CSRAdjacency(snapshot['names'], snapshot['offsets'], snapshot['targets'],
+                                  snapshot['weights'], snapshot['scenic'])
+        graph.adj_list = dict.fromkeys(snapshot['names'])
+        graph.frozen = True
+        graph.vertex_time = snapshot['vertex_time']
+        graph.vertex_popularity = snapshot.get('vertex_popularity', {})
+        graph.facilities = snapshot['facilities']
+        graph.positions = snapshot['positions']
+        graph.minutes_per_pixel = snapshot['minutes_per_pixel']
+        return graph
 
     def add_vertex(self, vertex):
         """
         添加顶点。
         """
         if vertex not in self.adj_list:
+            if self.frozen:
+                self.thaw()
             self.adj_list[vertex] = None
+            self._invalidate()
 
     def add_edge(self, src, dest, weight, bidirectional=True, scenic=None):
         """
         添加有权边，支持双向（无向图）添加边。
         """
+        if self.frozen:
+            self.thaw()
         if src not in self.adj_list:
             self.add_vertex(src)
         if dest not in self.adj_list:
@@ -144,112 +420,1113 @@ class Graph:
         if bidirectional:
             node = EdgeNode(src, weight, self.adj_list[dest], scenic)
             self.adj_list[dest] = node
+        self._invalidate()
+
+    def freeze(self):
+        """
+        把邻接表编译为紧凑的 CSR 表示并释放 EdgeNode 链表，适合加载后不再修改的大型场馆图。
+        冻结后仍可调用 add_vertex/add_edge，此时会先自动 thaw 恢复链表。
+        """
+        csr = self._compiled()
+        self.adj_list = dict.fromkeys(csr.names)
+        self.frozen = True
+
+    def thaw(self):
+        """
+        由 CSR 表示恢复 EdgeNode 链表，使图重新可以增量修改。
+        """
+        if not self.frozen:
+            return
+        csr = self._csr
+        for u, vertex in enumerate(csr.names):
+            head = None
+            # 逆序头插，恢复与冻结前相同的链表顺序
+            for e in range(csr.offsets[u + 1] - 1, csr.offsets[u] - 1, -1):
+                head = EdgeNode(csr.names[csr.targets[e]], csr.weights[e], head, csr.scenic.get(e))
+            self.adj_list[vertex] = head
+        self.frozen = False
+
+    def _compiled(self):
+        """
+        返回当前图的 CSR 表示，必要时由邻接表重新编译。
+        """
+        if self._csr is None:
+            self._csr = CSRAdjacency.from_adj_list(self.adj_list)
+        return self._csr
+
+    def _compiled_reverse(self):
+        """
+        返回当前图所有边反向后的 CSR 表示，用于反向搜索。
+        """
+        if self._reverse_csr is None:
+            self._reverse_csr = self._compiled().reversed()
+        return self._reverse_csr
+
+    def _invalidate(self):
+        """
+        图结构发生变化时使 CSR 表示和最短路径矩阵失效，并递增版本号使最短路径树缓存失效。
+        """
+        self.generation += 1
+        self._csr = None
+        self._reverse_csr = None
+        self._dist_matrix = None
+        self._next_matrix = None
+
+    def _dijkstra(self, s, reverse=False):
+        """
+        在 CSR 表示上以下标 s 为源点运行 Dijkstra。
+        reverse 为 True 时在反向图上运行，得到各顶点到 s 的距离，父结点即为前往 s 的下一跳。
+        :return: (距离列表, 父结点列表, 按出堆顺序排列的已确定顶点列表)
+        """
+        csr = self._compiled_reverse() if reverse else self._compiled()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        n = len(csr)
+        distance = [float('inf')] * n
+        parent = [-1] * n
+        distance[s] = 0
+        settled = []
+        heap = [(0, s)]
+        while heap:
+            current_dist, u = heapq.heappop(heap)
+            if current_dist > distance[u]:
+                continue
+            settled.append(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                new_dist = current_dist + weights[e]
+                if new_dist < distance[v]:
+                    distance[v] = new_dist
+                    parent[v] = u
+                    heapq.heappush(heap, (new_dist, v))
+        return distance, parent, settled
+
+    def build_distance_matrix(self):
+        """
+        以每个顶点为源点各运行一次 Dijkstra，构建全源最短距离矩阵和下一跳矩阵。
+        next_matrix[i][j] 为从顶点 i 出发前往顶点 j 的最短路径上的第一个顶点。
+        """
+        n = len(self._compiled())
+        dist_matrix = []
+        next_matrix = []
+        for s in range(n):
+            distance, parent, settled = self._dijkstra(s)
+            # 按出堆顺序（父结点总先于子结点）推出每个顶点的第一跳
+            next_hop = [-1] * n
+            next_hop[s] = s
+            for u in settled[1:]:
+                p = parent[u]
+                next_hop[u] = u if p == s else next_hop[p]
+            dist_matrix.append(distance)
+            next_matrix.append(next_hop)
+        self._dist_matrix = dist_matrix
+        self._next_matrix = next_matrix
+
+    def _use_matrix(self):
+        """
+        判断是否使用全源最短路径矩阵；矩阵失效且图不超过 MATRIX_VERTEX_LIMIT 个顶点时重新构建。
+        """
+        if self._dist_matrix is None:
+            if len(self._compiled()) > MATRIX_VERTEX_LIMIT:
+                return False
+            self.build_distance_matrix()
+        return True
+
+    def _shortest_tree(self, s):
+        """
+        返回以下标 s 为源点的最短路径树 (距离列表, 父结点列表)，优先从 LRU 缓存中读取。
+        缓存中的树在图的版本号变化后全部作废。
+        """
+        cache = self._tree_cache
+        if self._tree_generation != self.generation:
+            cache.clear()
+            self._tree_generation = self.generation
+        tree = cache.get(s)
+        if tree is not None:
+            cache.move_to_end(s)
+            self.cache_hits += 1
+            return tree
+        self.cache_misses += 1
+        distance, parent, _ = self._dijkstra(s)
+        tree = (distance, parent)
+        if self.tree_cache_size > 0:
+            cache[s] = tree
+            while len(cache) > self.tree_cache_size:
+                cache.popitem(last=False)
+        return tree
+
+    def cache_info(self):
+        """
+        返回最短路径树缓存的统计信息，便于确定缓存容量。
+        """
+        total = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / total if total else 0.0,
+            'size': len(self._tree_cache) if self._tree_generation == self.generation else 0,
+            'maxsize': self.tree_cache_size,
+            'generation': self.generation,
+        }
+
+    def _source(self, i):
+        """
+        返回以下标 i 为源点的 (距离列表, 父结点列表)：小图取矩阵的一行，父结点列表为 None；
+        大图取缓存的最短路径树。每次查询对每个源点只调用一次，缓存命中率才能反映真实的查询情况。
+        """
+        if self._use_matrix():
+            return self._dist_matrix[i], None
+        return self._shortest_tree(i)
+
+    def _target(self, j):
+        """
+        返回以下标 j 为终点的 (距离列表, 下一跳列表)：小图取矩阵的一列，下一跳列表为 None（沿下一跳矩阵前进）；
+        大图在反向图上运行一次 Dijkstra。
+        """
+        if self._use_matrix():
+            return [row[j] for row in self._dist_matrix], None
+        distance, toward, _ = self._dijkstra(j, reverse=True)
+        return distance, toward
+
+    def _distances_from(self, i):
+        """
+        返回从下标 i 出发到各顶点的最短距离列表（矩阵的一行或缓存的最短路径树）。
+        """
+        return self._source(i)[0]
+
+    def _path(self, i, j, source):
+        """
+        还原从下标 i 到下标 j 的最短路径（顶点名列表），时间复杂度为路径长度。
+        source 为 _source(i) 的返回值：父结点列表为 None 时沿下一跳矩阵前进，否则沿最短路径树的父结点回溯。
+        """
+        names = self._compiled().names
+        parent = source[1]
+        if parent is None:
+            path = [names[i]]
+            while i != j:
+                i = self._next_matrix[i][j]
+                path.append(names[i])
+            return path
+        path = []
+        while j != -1:
+            path.append(names[j])
+            j = parent[j]
+        path.reverse()
+        return path
 
     def display(self):
         """
         打印图的邻接表表示，包括每条边的权重和沿途小景点信息。
         """
-        for vertex in self.adj_list:
+        csr = self._compiled()
+        for u, vertex in enumerate(csr.names):
             print(f"{vertex}: ", end="")
-            current = self.adj_list[vertex]
-            while current:
-                scenic_info = f", scenic: {current.scenic}" if current.scenic else ""
-                print(f"{current.vertex}({current.weight}{scenic_info}) -> ", end="")
-                current = current.next
+            for v, weight, scenic in csr.edges(u):
+                scenic_info = f", scenic: {scenic}" if scenic else ""
+                print(f"{csr.names[v]}({weight}{scenic_info}) -> ", end="")
             print("End")
 
-    def get_shortest_route(self, start, target):
+    def get_shortest_route(self, start, target, algorithm=None):
+        """
+        求最短路径。默认小图直接从预计算的全源最短路径矩阵中读取，大图从按源点缓存的最短路径树中读取，
+        命中时只需沿指针还原路径，时间复杂度为路径长度。
+        指定 algorithm 时改为运行一次点对点搜索，见 route_query。
+        """
+        if algorithm is not None:
+            path, distance, _ = self.route_query(start, target, algorithm)
+            return path, distance
+        index = self._compiled().index
+        if start not in index or target not in index:
+            return None, None
+        i, j = index[start], index[target]
+        source = self._source(i)
+        distance = source[0][j]
+        if distance == float('inf'):
+            return None, None
+        return self._path(i, j, source), distance
+
+    def route_query(self, start, target, algorithm=ALGORITHM_DIJKSTRA):
         """
-        使用 Dijkstra 算法求最短路径。
+        运行一次点对点最短路径搜索，并返回扩展（出堆）的顶点数，便于比较各算法的开销。
+
+        :param algorithm: ALGORITHM_DIJKSTRA（普通 Dijkstra）、ALGORITHM_BIDIRECTIONAL（双向 Dijkstra）
+                          或 ALGORITHM_ASTAR（以地图坐标欧氏距离为启发函数的 A*）
+        :return: (路径列表, 时间, 扩展顶点数)，不可达时返回 (None, None, 扩展顶点数)
         """
-        distance = {vertex: float('inf') for vertex in self.adj_list}
-        parent = {vertex: None for vertex in self.adj_list}
-        distance[start] = 0
-        heap = [(0, start)]
+        csr = self._compiled()
+        if start not in csr.index or target not in csr.index:
+            return None, None, 0
+        s, t = csr.index[start], csr.index[target]
+        if algorithm == ALGORITHM_DIJKSTRA:
+            path, distance, expanded = self._astar(s, t, None)
+        elif algorithm == ALGORITHM_ASTAR:
+            path, distance, expanded = self._astar(s, t, self._heuristic_to(t))
+        elif algorithm == ALGORITHM_BIDIRECTIONAL:
+            path, distance, expanded = self._bidirectional(s, t)
+        else:
+            raise ValueError(f"未知的最短路径算法: {algorithm}")
+        if path is None:
+            return None, None, expanded
+        return [csr.names[v] for v in path], distance, expanded
+
+    def _astar(self, s, t, heuristic):
+        """
+        A* 搜索；heuristic 为 None 时退化为到达终点即停止的 Dijkstra。
+        启发函数可采信但不一定一致，因此发现更短的 g 值时允许重新扩展顶点。
+        :return: (顶点下标路径, 时间, 扩展顶点数)
+        """
+        csr = self._compiled()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        g = {s: 0}
+        parent = {s: -1}
+        heap = [(heuristic(s) if heuristic else 0, 0, s)]
+        expanded = 0
         while heap:
-            current_dist, u = heapq.heappop(heap)
-            if current_dist > distance[u]:
+            _, current_dist, u = heapq.heappop(heap)
+            if current_dist > g[u]:
                 continue
-            if u == target:
+            expanded += 1
+            if u == t:
+                path = []
+                while u != -1:
+                    path.append(u)
+                    u = parent[u]
+                path.reverse()
+                return path, current_dist, expanded
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                new_dist = current_dist + weights[e]
+                if new_dist < g.get(v, float('inf')):
+                    g[v] = new_dist
+                    parent[v] = u
+                    priority = new_dist + heuristic(v) if heuristic else new_dist
+                    heapq.heappush(heap, (priority, new_dist, v))
+        return None, None, expanded
+
+    def _bidirectional(self, s, t):
+        """
+        双向 Dijkstra：同时从起点正向、从终点在反向图上搜索，
+        两侧堆顶距离之和不小于当前最优相遇距离时停止。
+        :return: (顶点下标路径, 时间, 扩展顶点数)
+        """
+        if s == t:
+            return [s], 0, 1
+        sides = [
+            (self._compiled(), {s: 0}, {s: -1}, [(0, s)]),
+            (self._compiled_reverse(), {t: 0}, {t: -1}, [(0, t)]),
+        ]
+        best, meet = float('inf'), -1
+        expanded = 0
+        while sides[0][3] and sides[1][3]:
+            if sides[0][3][0][0] + sides[1][3][0][0] >= best:
                 break
-            current = self.adj_list[u]
-            while current:
-                v = current.vertex
-                weight = current.weight
-                if distance[u] + weight < distance[v]:
-                    distance[v] = distance[u] + weight
+            # 每次扩展堆更小的一侧
+            side = 0 if len(sides[0][3]) <= len(sides[1][3]) else 1
+            csr, dist, parent, heap = sides[side]
+            other_dist = sides[1 - side][1]
+            current_dist, u = heapq.heappop(heap)
+            if current_dist > dist[u]:
+                continue
+            expanded += 1
+            for e in range(csr.offsets[u], csr.offsets[u + 1]):
+                v = csr.targets[e]
+                new_dist = current_dist + csr.weights[e]
+                if new_dist < dist.get(v, float('inf')):
+                    dist[v] = new_dist
                     parent[v] = u
-                    heapq.heappush(heap, (distance[v], v))
-                current = current.next
-        if distance[target] == float('inf'):
-            return None, None
+                    heapq.heappush(heap, (new_dist, v))
+                if v in other_dist and dist[v] + other_dist[v] < best:
+                    best, meet = dist[v] + other_dist[v], v
+        if meet == -1:
+            return None, None, expanded
+        forward_parent, backward_parent = sides[0][2], sides[1][2]
         path = []
-        v = target
-        while v is not None:
+        v = meet
+        while v != -1:
             path.append(v)
-            v = parent[v]
+            v = forward_parent[v]
         path.reverse()
-        return path, distance[target]
+        v = backward_parent[meet]
+        while v != -1:
+            path.append(v)
+            v = backward_parent[v]
+        return path, best, expanded
+
+    def load_positions(self, file_path="SceneryPosition.txt"):
+        """
+        读取景点地图坐标文件（每行格式：名称 x y），记录图中各顶点的像素坐标。
+        合并顶点（如 '嘉荫堂/正殿/省亲别墅'）按 '/' 拆分后分别匹配，可能对应多个坐标。
+        读取后重新标定 A* 使用的每像素分钟数。
+        """
+        points = {}
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 3:
+                        continue
+                    try:
+                        points[parts[0]] = (int(parts[1]), int(parts[2]))
+                    except ValueError:
+                        print(f"坐标转换错误: {line.strip()}")
+        except Exception as e:
+            print("读取坐标文件失败:", e)
+            return
+        self.positions = {}
+        for vertex in self.adj_list:
+            found = [points[name] for name in vertex.split('/') if name in points]
+            if found:
+                self.positions[vertex] = found
+        self.calibrate_heuristic()
+
+    def _pixel_distance(self, u, v):
+        """
+        两个顶点坐标之间的最小欧氏距离（像素），任一顶点没有坐标时返回 None。
+        """
+        pu, pv = self.positions.get(u), self.positions.get(v)
+        if not pu or not pv:
+            return None
+        return min(math.hypot(a[0] - b[0], a[1] - b[1]) for a in pu for b in pv)
+
+    def calibrate_heuristic(self):
+        """
+        标定每像素分钟数：取所有有坐标的顶点对中 最短时间 / 像素距离 的最小值，
+        从而保证 A* 的欧氏距离下界不超过真实最短时间（启发函数可采信）。
+        """
+        csr = self._compiled()
+        positioned = [v for v in self.positions if v in csr.index]
+        factor = None
+        for u in positioned:
+            distance = self._distances_from(csr.index[u])
+            for v in positioned:
+                pixels = self._pixel_distance(u, v)
+                d = distance[csr.index[v]]
+                if u == v or not pixels or d == float('inf'):
+                    continue
+                if factor is None or d / pixels < factor:
+                    factor = d / pixels
+        self.minutes_per_pixel = factor
+
+    def _heuristic_to(self, t):
+        """
+        返回以下标 t 为终点的 A* 启发函数：每像素分钟数 × 欧氏距离，没有坐标的顶点取 0。
+        """
+        names = self._compiled().names
+        target = names[t]
+        factor = self.minutes_per_pixel
+        if not factor or target not in self.positions:
+            return lambda v: 0
+        cache = {}
+
+        def heuristic(v):
+            h = cache.get(v)
+            if h is None:
+                pixels = self._pixel_distance(names[v], target)
+                h = cache[v] = factor * pixels if pixels is not None else 0
+            return h
+        return heuristic
+
+    def validate_search(self, pairs=None):
+        """
+        以查表结果为准，校验点对点 Dijkstra、双向 Dijkstra 和 A* 的最短时间，并统计各算法的扩展顶点总数。
+
+        :param pairs: 待校验的 (起点, 终点) 列表，默认为全部顶点对
+        :return: {'pairs': 顶点对数, 'mismatches': [(起点, 终点, 算法, 结果, 期望)], 'expanded': {算法: 扩展顶点总数}}
+        """
+        names = self._compiled().names
+        if pairs is None:
+            pairs = [(u, v) for u in names for v in names]
+        algorithms = (ALGORITHM_DIJKSTRA, ALGORITHM_BIDIRECTIONAL, ALGORITHM_ASTAR)
+        mismatches = []
+        expanded = dict.fromkeys(algorithms, 0)
+        for start, target in pairs:
+            _, expected = self.get_shortest_route(start, target)
+            for algorithm in algorithms:
+                _, distance, count = self.route_query(start, target, algorithm)
+                expanded[algorithm] += count
+                if distance is not None and expected is not None:
+                    ok = abs(distance - expected) <= 1e-9
+                else:
+                    ok = distance == expected
+                if not ok:
+                    mismatches.append((start, target, algorithm, distance, expected))
+        return {'pairs': len(pairs), 'mismatches': mismatches, 'expanded': expanded}
 
     # 修改后的规划必经景点的路径方法
     def get_visit_path(self, required, start=None, end=None):
         """
         在全图中寻找一条从 start 到 end 的路径，该路径必须经过所有必经景点（required）。
-        这里采用枚举必经景点中除起点和终点外的排列组合，再利用已有的最短路径方法连接各个必经景点。
+        求解方法见 plan_visit_path，这里只返回路径和时间。
 
         :param required: 用户选择的必经景点列表
         :param start: 起点（必须在 required 中）
         :param end: 终点（必须在 required 中）
         :return: (路径列表, [旅行时间, 游玩时长, 总时间])，若无解则返回 (None, None)
         """
+        path, times, _ = self.plan_visit_path(required, start, end)
+        return path, times
+
+    def plan_visit_path(self, required, start=None, end=None, time_limit=HEURISTIC_TIME_LIMIT):
+        """
+        规划经过所有必经景点的路径，并报告结果是否为最优解。
+        中间必经景点不超过 HELD_KARP_LIMIT 个时使用 Held-Karp 状态压缩动态规划精确求解，
+        否则使用最近插入法构造初始路线，再在 time_limit 秒内用 2-opt、Or-opt 和随机扰动改进。
+
+        :param required: 用户选择的必经景点列表
+        :param start: 起点（必须在 required 中）
+        :param end: 终点（必须在 required 中）
+        :param time_limit: 启发式算法的时间上限（秒）
+        :return: (路径列表, [旅行时间, 游玩时长, 总时间], 是否最优)，若无解则返回 (None, None, False)
+        """
         if not required or start not in required or end not in required:
-            return None, None
+            return None, None, False
+        index = self._compiled().index
+        if any(v not in index for v in required):
+            return None, None, False
 
-        # 取得除起点和终点之外的必经景点
-        intermediate = [v for v in required if v != start and v != end]
-
-        best_path = None
-        best_travel_time = float('inf')
-
-        # 枚举所有中间必经景点的排列
-        for perm in itertools.permutations(intermediate):
-            sequence = [start] + list(perm) + [end]
-            total_travel_time = 0
-            candidate_path = []
-            valid = True
-            for i in range(len(sequence) - 1):
-                subpath, subtime = self.get_shortest_route(sequence[i], sequence[i + 1])
-                if subpath is None:
-                    valid = False
-                    break
-                if i == 0:
-                    candidate_path.extend(subpath)
-                else:
-                    # 避免重复加入上一个子路径的终点
-                    candidate_path.extend(subpath[1:])
-                total_travel_time += subtime
-            if valid and total_travel_time < best_travel_time:
-                best_travel_time = total_travel_time
-                best_path = candidate_path
-
-        if best_path is None:
-            return None, None
+        # 取得除起点和终点之外的必经景点（去重并保持顺序）
+        s, t = index[start], index[end]
+        intermediate = []
+        for v in required:
+            i = index[v]
+            if i != s and i != t and i not in intermediate:
+                intermediate.append(i)
+
+        # 只取起终点和必经景点为源点的距离行，dist[u][v] 即 u 到 v 的最短时间
+        sources = {u: self._source(u) for u in [s, t] + intermediate}
+        dist = {u: source[0] for u, source in sources.items()}
+        if len(intermediate) <= HELD_KARP_LIMIT:
+            order = self._held_karp(dist, s, t, intermediate)
+            optimal = True
+        else:
+            order = self._heuristic_order(dist, s, t, intermediate, time.perf_counter() + time_limit)
+            optimal = False
+        if order is None:
+            return None, None, False
+
+        sequence = [s] + order + [t]
+        travel_time = sum(dist[sequence[i]][sequence[i + 1]] for i in range(len(sequence) - 1))
+        if travel_time == float('inf'):
+            return None, None, False
+
+        path = [self._compiled().names[s]]
+        for i in range(len(sequence) - 1):
+            # 避免重复加入上一个子路径的终点
+            path.extend(self._path(sequence[i], sequence[i + 1], sources[sequence[i]])[1:])
 
         # 计算各景点的游玩时长（按路径中每个景点的参考时长求和）
-        visit_time = sum(self.vertex_time.get(v, 0) for v in best_path)
-        total_time = best_travel_time + visit_time
-        return best_path, [best_travel_time, visit_time, total_time]
+        visit_time = sum(self.vertex_time.get(v, 0) for v in path)
+        total_time = travel_time + visit_time
+        return path, [travel_time, visit_time, total_time], optimal
+
+    def _held_karp(self, dist, s, t, nodes):
+        """
+        Held-Karp 动态规划：dp[mask][i] 表示从起点出发、恰好经过 mask 中的景点并停在 nodes[i] 的最短时间。
+        时间复杂度 O(2^k * k^2)，返回中间景点的最优访问顺序（顶点下标列表），不可达时返回 None。
+        """
+        inf = float('inf')
+        k = len(nodes)
+        if k == 0:
+            return [] if dist[s][t] < inf else None
+        full = (1 << k) - 1
+        dp = [[inf] * k for _ in range(1 << k)]
+        parent = [[-1] * k for _ in range(1 << k)]
+        for i, v in enumerate(nodes):
+            dp[1 << i][i] = dist[s][v]
+        rows = [[dist[u][v] for v in nodes] for u in nodes]
+        for mask in range(1, full + 1):
+            row = dp[mask]
+            for i in range(k):
+                cost = row[i]
+                if cost == inf:
+                    continue
+                ri = rows[i]
+                for j in range(k):
+                    if mask >> j & 1:
+                        continue
+                    new_mask = mask | (1 << j)
+                    new_cost = cost + ri[j]
+                    if new_cost < dp[new_mask][j]:
+                        dp[new_mask][j] = new_cost
+                        parent[new_mask][j] = i
+
+        best, last = inf, -1
+        for i, v in enumerate(nodes):
+            cost = dp[full][i] + dist[v][t]
+            if cost < best:
+                best, last = cost, i
+        if last < 0:
+            return None
+
+        # 沿 parent 回溯得到访问顺序
+        order = []
+        mask = full
+        while last >= 0:
+            order.append(nodes[last])
+            mask, last = mask ^ (1 << last), parent[mask][last]
+        order.reverse()
+        return order
+
+    def _heuristic_order(self, dist, s, t, nodes, deadline):
+        """
+        启发式求解：最近插入法构造初始路线，再用 2-opt、Or-opt 局部搜索和随机扰动改进，直到超过 deadline。
+        返回中间景点的访问顺序（顶点下标列表）。
+        """
+        route = [s, t]
+        remaining = set(nodes)
+        # nearest[v] 为 v 到当前路线上任一顶点的最短距离
+        nearest = {v: min(dist[s][v], dist[v][s], dist[t][v], dist[v][t]) for v in remaining}
+        while remaining:
+            v = min(remaining, key=lambda x: nearest[x])
+            remaining.remove(v)
+            best_pos, best_delta = 1, float('inf')
+            for p in range(1, len(route)):
+                a, b = route[p - 1], route[p]
+                delta = dist[a][v] + dist[v][b] - dist[a][b]
+                if delta < best_delta:
+                    best_pos, best_delta = p, delta
+            route.insert(best_pos, v)
+            for u in remaining:
+                nearest[u] = min(nearest[u], dist[v][u], dist[u][v])
+
+        self._local_search(dist, route, deadline)
+
+        # 迭代局部搜索：在剩余时间内随机扰动最优路线后重新改进，连续多次无改进即提前结束
+        rng = random.Random(0)
+        best, best_cost = route, self._route_cost(dist, route)
+        stale = 0
+        while len(best) > 4 and stale < 50 and time.perf_counter() < deadline:
+            candidate = best[:]
+            i, j = sorted(rng.sample(range(1, len(candidate) - 1), 2))
+            candidate[i:j + 1] = candidate[i:j + 1][::-1]
+            self._local_search(dist, candidate, deadline)
+            cost = self._route_cost(dist, candidate)
+            if cost < best_cost:
+                best, best_cost = candidate, cost
+                stale = 0
+            else:
+                stale += 1
+        return best[1:-1]
+
+    def _route_cost(self, dist, route):
+        """
+        计算路线（顶点下标列表）各段最短时间之和。
+        """
+        return sum(dist[route[i]][route[i + 1]] for i in range(len(route) - 1))
+
+    def _local_search(self, dist, route, deadline):
+        """
+        交替使用 2-opt 和 Or-opt 原地改进路线，直到无改进或超过 deadline。
+        """
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self._two_opt(dist, route, deadline) | self._or_opt(dist, route, deadline)
+
+    def _two_opt(self, dist, route, deadline):
+        """
+        2-opt 改进：反转 route[i..j]（不含首尾），支持非对称距离。返回是否有改进。
+        """
+        n = len(route)
+        improved = False
+        for i in range(1, n - 2):
+            if time.perf_counter() > deadline:
+                break
+            forward = backward = 0
+            for j in range(i + 1, n - 1):
+                # forward/backward 为 route[i..j] 正向和反向经过的内部时间
+                forward += dist[route[j - 1]][route[j]]
+                backward += dist[route[j]][route[j - 1]]
+                a, b = route[i - 1], route[j + 1]
+                old = dist[a][route[i]] + forward + dist[route[j]][b]
+                new = dist[a][route[j]] + backward + dist[route[i]][b]
+                if new < old:
+                    route[i:j + 1] = route[i:j + 1][::-1]
+                    improved = True
+                    forward, backward = backward, forward
+        return improved
+
+    def _or_opt(self, dist, route, deadline):
+        """
+        Or-opt 改进：把长度为 1~3 的连续片段移动到路线的其他位置（保持方向）。返回是否有改进。
+        """
+        improved = False
+        for length in (1, 2, 3):
+            i = 1
+            while i + length < len(route):
+                if time.perf_counter() > deadline:
+                    return improved
+                first, last = route[i], route[i + length - 1]
+                prev, nxt = route[i - 1], route[i + length]
+                removed = dist[prev][first] + dist[last][nxt] - dist[prev][nxt]
+                segment = route[i:i + length]
+                rest = route[:i] + route[i + length:]
+                best_pos, best_gain = -1, 0
+                for p in range(1, len(rest)):
+                    if p == i:
+                        continue
+                    a, b = rest[p - 1], rest[p]
+                    gain = removed - (dist[a][first] + dist[last][b] - dist[a][b])
+                    if gain > best_gain:
+                        best_pos, best_gain = p, gain
+                if best_pos > 0:
+                    route[:] = rest[:best_pos] + segment + rest[best_pos:]
+                    improved = True
+                else:
+                    i += 1
+        return improved
+
+    def set_popularity(self, popularity):
+        """
+        设置各顶点的热度评分。合并顶点（如 '嘉荫堂/正殿/省亲别墅'）取各组成景点热度之和。
+
+        :param popularity: {景点名: 热度}
+        """
+        self.vertex_popularity = {}
+        for vertex in self.adj_list:
+            score = sum(popularity.get(name, 0) for name in vertex.split('/'))
+            if score > 0:
+                self.vertex_popularity[vertex] = score
+
+    def get_budget_tour(self, start, end, budget):
+        """
+        在给定时间内规划热度总和最高的游览路线，求解方法见 plan_budget_tour。
+        :return: (路径列表, [旅行时间, 游玩时长, 总时间])，若无解则返回 (None, None)
+        """
+        path, times, _, _ = self.plan_budget_tour(start, end, budget)
+        return path, times
+
+    def plan_budget_tour(self, start, end, budget, time_limit=TOUR_TIME_LIMIT):
+        """
+        限时游览规划（定向越野问题）：从 start 出发到 end 结束，选择要游玩的景点，
+        使旅行时间加上所选景点（含起终点）的参考游玩时长不超过 budget，且热度总和最大。
+        先用贪心插入加局部搜索得到初始解，候选景点不超过 TOUR_EXACT_LIMIT 个时再用分支限界求精确解；
+        两者共用 time_limit 秒的时间上限，超时则返回当前最好的解。
+        途经但未选中的顶点只计旅行时间，不计游玩时长。
+
+        :param start: 起点
+        :param end: 终点
+        :param budget: 可用总时间（分钟）
+        :param time_limit: 求解时间上限（秒）
+        :return: (路径列表, [旅行时间, 游玩时长, 总时间], 游玩景点列表, 是否最优)，无解时返回 (None, None, None, False)
+        """
+        deadline = time.perf_counter() + time_limit
+        csr = self._compiled()
+        if start not in csr.index or end not in csr.index:
+            return None, None, None, False
+        s, t = csr.index[start], csr.index[end]
+        names = csr.names
+        dwell = {i: self.vertex_time.get(names[i], 0) for i in (s, t)}
+        base_time = dwell[s] + (dwell[t] if t != s else 0)
+        remaining = budget - base_time
+
+        candidates = []
+        for vertex, score in self.vertex_popularity.items():
+            i = csr.index.get(vertex)
+            if i is not None and i != s and i != t and score > 0:
+                candidates.append(i)
+                dwell[i] = self.vertex_time.get(vertex, 0)
+        start_source = self._source(s)
+        from_s = start_source[0]
+        if remaining < from_s[t]:
+            return None, None, None, False
+        to_t, toward_t = self._target(t)
+        score = {i: self.vertex_popularity[names[i]] for i in candidates}
+        # 单独游玩后仍能到达终点的景点才是可行候选，只需一次正向和一次反向 Dijkstra 即可判断
+        candidates = [i for i in candidates if from_s[i] + dwell[i] + to_t[i] <= remaining]
+
+        def single_cost(i):
+            return from_s[i] + dwell[i] + to_t[i] - from_s[t]
+
+        # 只为剩下的候选景点取距离行（终点那一行用不到），按单独游玩的性价比从高到低取，超时即停止
+        candidates.sort(key=lambda i: score[i] / single_cost(i) if single_cost(i) > 0 else float('inf'),
+                        reverse=True)
+        sources = {s: start_source}
+        for i in candidates:
+            if time.perf_counter() > deadline:
+                break
+            sources[i] = self._source(i)
+        if len(sources) <= len(candidates):
+            # 超时：只用起终点的距离做一步贪心插入，游玩性价比最高的一个景点
+            v = candidates[0]
+            path = self._path(s, v, start_source)
+            u = v
+            while u != t:
+                u = self._next_matrix[u][t] if toward_t is None else toward_t[u]
+                path.append(names[u])
+            travel_time = from_s[v] + to_t[v]
+            visit_time = base_time + dwell[v]
+            return path, [travel_time, visit_time, travel_time + visit_time], [names[v]], False
+        dist = {u: source[0] for u, source in sources.items()}
+
+        route = self._greedy_tour(dist, dwell, score, s, t, candidates, remaining, deadline)
+        optimal = False
+        if len(candidates) <= TOUR_EXACT_LIMIT:
+            best = self._branch_and_bound_tour(dist, dwell, score, s, t, candidates, remaining,
+                                               route, deadline)
+            if best is not None:
+                route, optimal = best
+
+        travel_time = self._route_cost(dist, route)
+        stops = route[1:-1]
+        visit_time = base_time + sum(dwell[i] for i in stops)
+        path = [names[s]]
+        for i in range(len(route) - 1):
+            path.extend(self._path(route[i], route[i + 1], sources[route[i]])[1:])
+        return path, [travel_time, visit_time, travel_time + visit_time], [names[i] for i in stops], optimal
+
+    def _greedy_tour(self, dist, dwell, score, s, t, candidates, remaining, deadline):
+        """
+        贪心插入：反复选择 热度 / (插入后增加的旅行时间 + 游玩时长) 最高且不超时的景点插入路线，
+        每次插入后用局部搜索缩短旅行时间，腾出时间继续插入。返回顶点下标路线。
+        """
+        route = [s, t]
+        used = dist[s][t]
+        left = set(candidates)
+        while left and time.perf_counter() < deadline:
+            best = None
+            for v in left:
+                for p in range(1, len(route)):
+                    a, b = route[p - 1], route[p]
+                    cost = dist[a][v] + dist[v][b] - dist[a][b] + dwell[v]
+                    if used + cost > remaining:
+                        continue
+                    ratio = score[v] / cost if cost > 0 else float('inf')
+                    if best is None or ratio > best[0]:
+                        best = (ratio, v, p, cost)
+            if best is None:
+                break
+            _, v, p, cost = best
+            route.insert(p, v)
+            left.remove(v)
+            used += cost
+            if len(route) > 3:
+                self._local_search(dist, route, deadline)
+                used = self._route_cost(dist, route) + sum(dwell[i] for i in route[1:-1])
+        return route
+
+    def _branch_and_bound_tour(self, dist, dwell, score, s, t, candidates, remaining, incumbent, deadline):
+        """
+        分支限界求精确解：深度优先逐个追加景点。
+        上界为分数背包松弛：每个景点至少花费 游玩时长 + 从任一其他顶点到达它的最短时间，
+        按热度 / 花费从高到低装入剩余时间，最后一个可部分装入。
+        以相同景点集合停在同一顶点、但已用时间不更少的状态被剪枝。
+        :return: (最优路线, 是否在时间上限内完成搜索)
+        """
+        best_score = sum(score[i] for i in incumbent[1:-1])
+        best_route = incumbent
+        finished = True
+        min_cost = {v: dwell[v] + min(dist[u][v] for u in [s] + candidates if u != v) for v in candidates}
+        # 按性价比排序，先搜索更有希望的分支，同时也是背包松弛的装入顺序
+        order = sorted(candidates, key=lambda v: -score[v] / min_cost[v] if min_cost[v] > 0 else float('-inf'))
+        bit = {v: 1 << k for k, v in enumerate(order)}
+        # (已访问景点集合, 当前顶点) -> 已知最少用时
+        seen = {}
+        route = [s]
+
+        def upper_bound(capacity, feasible):
+            bound = 0
+            for v in feasible:
+                if min_cost[v] <= capacity:
+                    capacity -= min_cost[v]
+                    bound += score[v]
+                else:
+                    return bound + score[v] * capacity / min_cost[v]
+            return bound
+
+        def search(u, mask, used, total, available):
+            nonlocal best_score, best_route, finished
+            if not finished:
+                return
+            state = (mask, u)
+            if seen.get(state, float('inf')) <= used:
+                return
+            seen[state] = used
+            if time.perf_counter() > deadline:
+                finished = False
+                return
+            if total > best_score:
+                best_score, best_route = total, route + [t]
+            feasible = [v for v in available if used + dist[u][v] + dwell[v] + dist[v][t] <= remaining]
+            if not feasible:
+                return
+            # 结束前至少还要走一段到终点的路
+            last_leg = min(dist[v][t] for v in feasible + [u])
+            if total + upper_bound(remaining - used - last_leg, feasible) <= best_score:
+                return
+            for v in feasible:
+                route.append(v)
+                search(v, mask | bit[v], used + dist[u][v] + dwell[v], total + score[v],
+                       [w for w in feasible if w != v])
+                route.pop()
+
+        search(s, 0, 0, 0, order)
+        if len(best_route) > 3:
+            self._local_search(dist, best_route, deadline)
+        return best_route, finished
+
+    def add_facility(self, vertex, category):
+        """
+        把顶点登记为某类设施（如厕所、出口、餐饮、急救）。顶点不存在时会先添加顶点。
+        """
+        self.add_vertex(vertex)
+        self.facilities.setdefault(category, set()).add(vertex)
+        self._facility_fields.pop(category, None)
+
+    def _facility_field(self, category):
+        """
+        以该类别的全部设施为源点，在反向图上运行一次多源 Dijkstra。
+        得到每个顶点到最近设施的距离 distance 和前往该设施的下一跳 toward（设施本身为 -1），
+        之后任意起点的最近设施查询只需沿 toward 前进。
+        """
+        field = self._facility_fields.get(category)
+        if field is not None and field[0] == self.generation:
+            return field[1], field[2]
+        csr = self._compiled_reverse()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        n = len(csr)
+        distance = [float('inf')] * n
+        toward = [-1] * n
+        heap = []
+        for vertex in self.facilities.get(category, ()):
+            f = csr.index[vertex]
+            distance[f] = 0
+            heap.append((0, f))
+        heapq.heapify(heap)
+        while heap:
+            current_dist, u = heapq.heappop(heap)
+            if current_dist > distance[u]:
+                continue
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                new_dist = current_dist + weights[e]
+                if new_dist < distance[v]:
+                    distance[v] = new_dist
+                    toward[v] = u
+                    heapq.heappush(heap, (new_dist, v))
+        self._facility_fields[category] = (self.generation, distance, toward)
+        return distance, toward
+
+    def nearest(self, start, category, k=1):
+        """
+        查找离起点最近的 k 个某类设施。
+        k == 1 时使用该类别预计算的反向多源最短路径场，只需沿下一跳还原路径；
+        k > 1 时从起点运行一次 Dijkstra，确定 k 个设施后立即停止。
+
+        :param start: 起点
+        :param category: 设施类别，如 FACILITY_TOILET
+        :param k: 返回的设施个数
+        :return: [(设施顶点, 路径列表, 时间), ...]，按时间升序排列；无可达设施时返回空列表
+        """
+        csr = self._compiled()
+        facilities = self.facilities.get(category)
+        if start not in csr.index or not facilities or k <= 0:
+            return []
+        s = csr.index[start]
+        names = csr.names
+
+        if k == 1:
+            distance, toward = self._facility_field(category)
+            if distance[s] == float('inf'):
+                return []
+            path = [names[s]]
+            u = s
+            while toward[u] != -1:
+                u = toward[u]
+                path.append(names[u])
+            return [(names[u], path, distance[s])]
+
+        targets_left = {csr.index[v] for v in facilities}
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        distance = {s: 0}
+        parent = {s: -1}
+        heap = [(0, s)]
+        results = []
+        while heap and len(results) < k:
+            current_dist, u = heapq.heappop(heap)
+            if current_dist > distance[u]:
+                continue
+            if u in targets_left:
+                targets_left.discard(u)
+                path = []
+                v = u
+                while v != -1:
+                    path.append(names[v])
+                    v = parent[v]
+                path.reverse()
+                results.append((names[u], path, current_dist))
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                new_dist = current_dist + weights[e]
+                if new_dist < distance.get(v, float('inf')):
+                    distance[v] = new_dist
+                    parent[v] = u
+                    heapq.heappush(heap, (new_dist, v))
+        return results
 
     def find_wc(self, start):
         """
         在图中查找最近的厕所。
         """
-        path1, time1 = self.get_shortest_route(start, '厕所1')
-        path2, time2 = self.get_shortest_route(start, '厕所2')
-        if time1 <= time2:
-            return path1, time1
+        found = self.nearest(start, FACILITY_TOILET)
+        if not found:
+            return None, None
+        _, path, time_val = found[0]
+        return path, time_val
+
+
+class GraphService:
+    """
+    进程内共享的路线规划服务：只构建一次图，并持有图的派生结构（最短路径矩阵、最短路径树缓存、设施场等），
+    供所有对话框共用。图可以在后台线程中预热；由于查询会更新缓存，所有访问都通过同一把锁串行执行，
+    因此可以在非 UI 线程中调用。
+    """
+
+    def __init__(self, file_path=None, setup=None):
+        """
+        :param file_path: 图数据文件，None 时使用 create_graph 内置数据
+        :param setup: 可选的回调函数，图构建完成后以图为参数调用（如设置热度、加载坐标）。
+            调用时服务已就绪且仍持有服务锁，回调中可以再调用本服务的方法；其他线程的查询等待回调完成
+        """
+        self.file_path = file_path
+        self.setup = setup
+        self._graph = None
+        self._error = None
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._warming = False
+
+    def warm_up(self, background=True):
+        """
+        构建图及其最短路径数据。background 为 True 时在守护线程中进行并立即返回。
+        """
+        with self._lock:
+            if self._warming or self._ready.is_set():
+                return
+            self._warming = True
+        if background:
+            threading.Thread(target=self._build, name="GraphService-warm-up", daemon=True).start()
         else:
-            return path2, time2
+            self._build()
+
+    def _build(self):
+        """
+        在当前线程中构建图，完成（或失败）后通知等待者。
+        """
+        with self._lock:
+            try:
+                graph = Graph()
+                graph.create_graph(self.file_path)
+                # 先通知就绪再调用 setup：回调中访问服务时不会在 _ready 上永远等待（锁可重入），
+                # 其他线程的查询则在锁上等到 setup 完成
+                self._graph = graph
+                self._ready.set()
+                if self.setup is not None:
+                    self.setup(graph)
+            except Exception as e:
+                self._graph = None
+                self._error = e
+                print("构建游览图失败:", e)
+            finally:
+                self._ready.set()
+
+    def wait_ready(self, timeout=None):
+        """
+        等待图构建完成（未开始预热时在当前线程中构建）。
+        :return: 图是否已可用
+        """
+        self.warm_up(background=False)
+        self._ready.wait(timeout)
+        return self._graph is not None
+
+    def read(self):
+        """
+        返回持有服务锁的上下文管理器，在 with 语句块中可安全地访问图：
+            with service.read() as graph:
+                graph.get_shortest_route(a, b)
+        """
+        return _LockedGraph(self)
+
+    def attractions(self):
+        """
+        返回所有景点（有参考游玩时长的顶点）名称列表。
+        """
+        with self.read() as graph:
+            return list(graph.vertex_time.keys())
+
+    def get_shortest_route(self, start, target, algorithm=None):
+        """
+        加锁调用 Graph.get_shortest_route。
+        """
+        with self.read() as graph:
+            return graph.get_shortest_route(start, target, algorithm)
+
+    def plan_visit_path(self, required, start=None, end=None):
+        """
+        加锁调用 Graph.plan_visit_path。
+        """
+        with self.read() as graph:
+            return graph.plan_visit_path(required, start, end)
+
+    def plan_budget_tour(self, start, end, budget):
+        """
+        加锁调用 Graph.plan_budget_tour。
+        """
+        with self.read() as graph:
+            return graph.plan_budget_tour(start, end, budget)
+
+    def nearest(self, start, category, k=1):
+        """
+        加锁调用 Graph.nearest。
+        """
+        with self.read() as graph:
+            return graph.nearest(start, category, k)
+
+
+class _LockedGraph:
+    """
+    GraphService.read 返回的上下文管理器：进入时等待图就绪并加锁，退出时释放锁。
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def __enter__(self):
+        if not self.service.wait_ready():
+            raise RuntimeError(f"游览图不可用: {self.service._error}")
+        self.service._lock.acquire()
+        if self.service._graph is None:
+            # 等待期间 setup 失败，图已作废
+            self.service._lock.release()
+            raise RuntimeError(f"游览图不可用: {self.service._error}")
+        return self.service._graph
+
+    def __exit__(self, exc_type, exc, tb):
+        self.service._lock.release()
+        return False
+
+
+_graph_service = None
+_graph_service_lock = threading.Lock()
+
+
+def get_graph_service(file_path=None, setup=None):
+    """
+    返回进程内唯一的 GraphService，首次调用时按给定参数创建（之后的参数被忽略）。
+    """
+    global _graph_service
+    with _graph_service_lock:
+        if _graph_service is None:
+            _graph_service = GraphService(file_path, setup)
+        return _graph_service
+
+
+def _number(text):
+    """
+    把数据文件中的数值字段转换为 int（若为整数）或 float。
+    """
+    if isinstance(text, (int, float)):
+        return text
+    value = float(text)
+    return int(value) if value.is_integer() else value
 
 
 if __name__ == "__main__":
@@ -1,4 +1,22 @@
+import math
+import re
+from array import array
+from bisect import bisect_left, insort
+from heapq import heappush, heapreplace, nsmallest
+from pypinyin import lazy_pinyin
+from Sorting import chinese_to_pinyin_initials, record_key
+
+# 拼音前缀树每个节点缓存的热度最高的景点数
+PINYIN_TOP_K = 10
+# 全文检索各字段的权重：名称中的命中比简介中的更重要
+FULLTEXT_BOOSTS = {"name": 3.0, "tags": 2.0, "description": 1.0, "flower": 1.0}
+# BM25 参数：k1 控制词频饱和速度，b 控制文档长度归一化的程度
+BM25_K1 = 1.2
+BM25_B = 0.75
+
 class ScenicSpot:
+    __slots__ = ("id", "name", "description", "tags", "heat", "flower", "visit_count", "initials")
+
     def __init__(self, id, name, description, tags, heat=0, flower="", visit_count=0):
         self.id = id          # 景点唯一标识
         self.name = name      # 景点名称（如"潇湘馆"）
@@ -7,6 +25,133 @@ class ScenicSpot:
         self.heat = heat      # 热度值（根据访问量动态更新）
         self.flower = flower  # 花签词
         self.visit_count = visit_count  # 新增浏览人次属性
+        self.initials = None  # 名称拼音首字母，由 Sorting.precompute_initials 填入
+
+def _column(name, doc):
+    """SpotRow 上读写 SpotTable 某一列的属性"""
+    def getter(row):
+        return getattr(row.table, name)[row.row]
+
+    def setter(row, value):
+        getattr(row.table, name)[row.row] = value
+
+    return property(getter, setter, doc=doc)
+
+class SpotRow:
+    """
+    SpotTable 中一行的轻量视图，本身只保存表和行号。可以像 ScenicSpot 一样读写属性，
+    也可以像 load_scenery_info 返回的字典一样用 row["name"]、row.get("popularity") 读取
+    （popularity 是 heat 的别名），因此 display_spots、Sorter 的关键字函数等现有代码可以直接使用。
+    同一行的不同视图相等且哈希相同。
+    """
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    id = _column("ids", "景点唯一标识")
+    name = _column("names", "景点名称")
+    description = _column("descriptions", "简介")
+    heat = _column("heats", "热度值")
+    flower = _column("flowers", "花签词")
+    visit_count = _column("visit_counts", "浏览人次")
+    initials = _column("initials", "名称拼音首字母，由 Sorting.precompute_initials 填入")
+    popularity = heat
+
+    @property
+    def tags(self):
+        """标签列表"""
+        return self.table.tags_of(self.row)
+
+    @tags.setter
+    def tags(self, tags):
+        self.table.set_tags(self.row, tags)
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def __eq__(self, other):
+        return isinstance(other, SpotRow) and other.table is self.table and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.table), self.row))
+
+    def __repr__(self):
+        return f"SpotRow({self.id}, {self.name!r})"
+
+class SpotTable:
+    """
+    景点的列式存储：每个字段一列，整数列（id、热度、浏览人次）用 array 保存，不为每条记录创建对象。
+    标签统一编号后按行首尾相接存入一个整数数组，tag_starts、tag_counts 记录每行标签所在的区间，
+    同一个标签只保存一份字符串。修改某行标签时把新标签追加到数组末尾，旧区间作废。
+    按行号取出的是 SpotRow 视图，每次取出的都是新视图，索引和 SortedView 按值识别同一行。
+    该存储需由调用方显式选用（如 SpotCatalog(SpotTable(all_spots))），默认的 spot_catalog、find_spots 和 GUI
+    仍使用 ScenicSpot 对象或字典。
+    """
+
+    def __init__(self, spots=()):
+        self.ids = array("q")
+        self.names = []
+        self.descriptions = []
+        self.heats = array("q")
+        self.flowers = []
+        self.visit_counts = array("q")
+        self.initials = []             # 名称拼音首字母，未计算时为 None
+        self.tag_pool = array("I")     # 各行标签编号首尾相接
+        self.tag_starts = array("q")   # 每行标签在 tag_pool 中的起点
+        self.tag_counts = array("I")   # 每行标签个数
+        self.tag_names = []            # 标签编号 -> 标签
+        self.tag_ids = {}              # 标签 -> 标签编号
+        for spot in spots:
+            self.append(spot.id, spot.name, spot.description, spot.tags, spot.heat, spot.flower, spot.visit_count,
+                        spot.initials)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.ids):
+            raise IndexError(row)
+        return SpotRow(self, row)
+
+    def __iter__(self):
+        return (SpotRow(self, row) for row in range(len(self.ids)))
+
+    def append(self, id, name, description, tags, heat=0, flower="", visit_count=0, initials=None):
+        """追加一行并返回它的视图"""
+        self.ids.append(id)
+        self.names.append(name)
+        self.descriptions.append(description)
+        self.heats.append(heat)
+        self.flowers.append(flower)
+        self.visit_counts.append(visit_count)
+        self.initials.append(initials)
+        self.tag_starts.append(0)
+        self.tag_counts.append(0)
+        row = len(self.ids) - 1
+        self.set_tags(row, tags)
+        return SpotRow(self, row)
+
+    def tags_of(self, row):
+        start = self.tag_starts[row]
+        return [self.tag_names[tag] for tag in self.tag_pool[start:start + self.tag_counts[row]]]
+
+    def set_tags(self, row, tags):
+        self.tag_starts[row] = len(self.tag_pool)
+        self.tag_counts[row] = len(tags)
+        for tag in tags:
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = self.tag_ids[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            self.tag_pool.append(tag_id)
 
 # 修正景点初始化参数（特别注意第6、11号景点的参数修正）
 all_spots = [
@@ -32,36 +177,580 @@ all_spots = [
     ScenicSpot(20, "沁芳闸", "宝黛读西厢与葬花路线起点", ["经典场景","水系枢纽","爱情路线"], 145)
 ]
 
-def find_spots(query):
-    """支持名称精确查找和标签模糊查找的景点检索"""
-    results = []
-    
-    # 名称精确查找（二分查找优化）
-    sorted_spots = sorted(all_spots, key=lambda x: x.name)
-    left, right = 0, len(sorted_spots)-1
-    
-    while left <= right:
-        mid = (left + right) // 2
-        if sorted_spots[mid].name == query:
-            # 找到后向两边扩展收集所有同名景点
-            i = mid
-            while i >= 0 and sorted_spots[i].name == query:
-                results.append(sorted_spots[i])
-                i -= 1
-            i = mid + 1
-            while i < len(sorted_spots) and sorted_spots[i].name == query:
-                results.append(sorted_spots[i])
-                i += 1
-            break
-        elif sorted_spots[mid].name < query:
-            left = mid + 1
+class SpotCatalog:
+    """
+    景点目录：维护 id→景点 和 名称→同名景点列表 两个哈希索引，只在构建时建立一次，
+    之后通过 add、update、remove 增删改景点时同步更新，按名称或 id 查找都是 O(1)。
+    另维护标签倒排索引：每个景点按加入顺序占一个槽位，每个标签对应一个位图（Python 整数，第 i 位表示第 i 个槽位），
+    多标签的 AND/OR/NOT 查询直接做位运算，结果按加入顺序返回；以及名称和简介的子串索引 text_index、
+    名称拼音前缀树 pinyin_index 和 BM25 全文检索 fulltext。
+    """
+
+    def __init__(self, spots=()):
+        self.by_id = {}    # 景点 id -> 景点
+        self.by_name = {}  # 景点名称 -> 同名景点列表（按加入顺序）
+        self.by_tag = {}   # 标签 -> 含该标签的景点槽位位图
+        self._slots = {}       # 景点 id -> 槽位
+        self._slot_spots = []  # 槽位 -> 景点，删除后留空为 None
+        self._all_bits = 0     # 所有在册景点的槽位位图
+        self.text_index = SubstringIndex()  # 名称和简介的子串索引
+        self.pinyin_index = PinyinTrie()    # 名称拼音（首字母和全拼）前缀树，按热度排序
+        self.fulltext = FullTextIndex()     # 名称、简介、标签、花签词的 BM25 全文检索
+        for spot in spots:
+            self.add(spot)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def __contains__(self, spot_id):
+        return spot_id in self.by_id
+
+    def get(self, spot_id):
+        """按 id 查找景点，不存在时返回 None"""
+        return self.by_id.get(spot_id)
+
+    def find_by_name(self, name):
+        """返回所有名称恰好为 name 的景点"""
+        return list(self.by_name.get(name, ()))
+
+    def add(self, spot):
+        """加入新景点，id 不能与已有景点重复"""
+        if spot.id in self.by_id:
+            raise ValueError(f"景点 id 重复: {spot.id}")
+        self.by_id[spot.id] = spot
+        self.by_name.setdefault(spot.name, []).append(spot)
+        slot = len(self._slot_spots)
+        self._slots[spot.id] = slot
+        self._slot_spots.append(spot)
+        self._all_bits |= 1 << slot
+        self._index_tags(slot, spot.tags)
+        self.text_index.add(spot)
+        self.pinyin_index.add(spot)
+        self.fulltext.add(spot)
+        return spot
+
+    def update(self, spot_id, **changes):
+        """修改景点属性（如 name、tags、heat），名称变化时同步更新名称索引"""
+        if "id" in changes:
+            raise ValueError("不能修改景点 id，请先 remove 再 add")
+        spot = self.by_id[spot_id]
+        if "name" in changes and changes["name"] != spot.name:
+            self._unindex_name(spot)
+            spot.name = changes["name"]
+            self.by_name.setdefault(spot.name, []).append(spot)
+        if "tags" in changes:
+            slot = self._slots[spot_id]
+            self._unindex_tags(slot, spot.tags)
+            self._index_tags(slot, changes["tags"])
+        for field, value in changes.items():
+            setattr(spot, field, value)
+        if "name" in changes or "description" in changes:
+            self.text_index.update(spot)
+        if "name" in changes or "heat" in changes:
+            self.pinyin_index.update(spot)
+        if any(field in changes for field in self.fulltext.boosts):
+            self.fulltext.update(spot)
+        return spot
+
+    def remove(self, spot_id):
+        """删除景点并返回它"""
+        spot = self.by_id.pop(spot_id)
+        self._unindex_name(spot)
+        slot = self._slots.pop(spot_id)
+        self._unindex_tags(slot, spot.tags)
+        self._slot_spots[slot] = None
+        self._all_bits &= ~(1 << slot)
+        self.text_index.remove(spot)
+        self.pinyin_index.remove(spot)
+        self.fulltext.remove(spot)
+        return spot
+
+    def search_text(self, query):
+        """返回名称或简介中包含 query 的景点"""
+        return self.text_index.search(query)
+
+    def search_pinyin(self, prefix, limit=None):
+        """返回名称拼音首字母或全拼以 prefix 开头的景点，按热度从高到低排列"""
+        return self.pinyin_index.search(prefix, limit)
+
+    def search_ranked(self, query, k=10, popularity_weight=0.0):
+        """全文检索，返回按 BM25 得分（可叠加热度先验）排序的前 k 条 (景点, 得分)"""
+        return self.fulltext.search(query, k, popularity_weight)
+
+    def find_by_tag(self, tag):
+        """返回所有带有该标签的景点"""
+        return self._spots_from_bits(self.by_tag.get(tag, 0))
+
+    def query_tags(self, expression):
+        """
+        多标签布尔查询，如 "诗词文化 AND 水景建筑 NOT 冬日景观"。
+        支持 AND、OR、NOT 和括号，优先级 NOT > AND > OR，相邻标签之间省略运算符时按 AND 处理。
+        表达式不合法时抛出 ValueError。
+        """
+        tokens = re.findall(r"[()]|[^\s()]+", expression)
+        if not tokens:
+            return []
+        parser = _TagQueryParser(tokens, self.by_tag, self._all_bits)
+        return self._spots_from_bits(parser.parse())
+
+    def _index_tags(self, slot, tags):
+        bit = 1 << slot
+        for tag in tags:
+            self.by_tag[tag] = self.by_tag.get(tag, 0) | bit
+
+    def _unindex_tags(self, slot, tags):
+        mask = ~(1 << slot)
+        for tag in set(tags):
+            bits = self.by_tag.get(tag, 0) & mask
+            if bits:
+                self.by_tag[tag] = bits
+            else:
+                self.by_tag.pop(tag, None)
+
+    def _spots_from_bits(self, bits):
+        return [self._slot_spots[slot] for slot in _bit_positions(bits)]
+
+    def _unindex_name(self, spot):
+        same_name = self.by_name[spot.name]
+        same_name.remove(spot)
+        if not same_name:
+            del self.by_name[spot.name]
+
+def _bit_positions(bits):
+    """按从低到高的顺序产出位图中置位的位置"""
+    # 二进制串反转后第 i 个字符对应第 i 位，用 str.find 跳到下一个置位，避免逐位做大整数运算
+    digits = bin(bits)[:1:-1]
+    position = digits.find("1")
+    while position != -1:
+        yield position
+        position = digits.find("1", position + 1)
+
+def _field(record, name, default=""):
+    """读取记录字段，兼容 ScenicSpot 等对象和 load_scenery_info 返回的字典"""
+    if isinstance(record, dict):
+        return record.get(name, default)
+    return getattr(record, name, default)
+
+class SubstringIndex:
+    """
+    名称和简介的字符 n-gram 倒排索引，用于边输入边搜索的子串查找。
+    每条记录按加入顺序占一个槽位，长度 1 到 n 的每个字符片段对应一个升序的槽位列表（片段很多且大多稀疏，
+    不适合用位图）；长度不超过 n 的查询直接取该片段的列表，更长的查询取其中最短的 n 字片段列表作为候选，
+    再逐条核对是否真的包含查询串。
+    若新查询包含上一次的查询（如继续输入一个字），直接在上一次的结果中筛选，不再从头查找。
+    比较时不区分大小写。记录可以是对象、字典或 SpotRow 视图。
+    """
+
+    def __init__(self, records=(), fields=("name", "description"), n=2):
+        self.fields = tuple(fields)
+        self.n = n
+        self.grams = {}    # 字符片段 -> 升序槽位列表
+        self._records = []  # 槽位 -> 记录，删除后留空为 None
+        self._texts = []    # 槽位 -> 各字段的小写文本
+        self._slots = {}    # 记录的识别键 -> 槽位
+        self._last = None   # 上一次查询及其结果槽位
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, record):
+        if record_key(record) in self._slots:
+            raise ValueError(f"记录已在索引中: {record!r}")
+        slot = len(self._records)
+        texts = tuple(str(_field(record, f) or "").lower() for f in self.fields)
+        self._slots[record_key(record)] = slot
+        self._records.append(record)
+        self._texts.append(texts)
+        for gram in self._grams_of(texts):
+            # 新槽位总是最大，直接追加即可保持升序
+            self.grams.setdefault(gram, []).append(slot)
+        self._last = None
+
+    def remove(self, record):
+        slot = self._slots.pop(record_key(record))
+        for gram in self._grams_of(self._texts[slot]):
+            posting = self.grams[gram]
+            del posting[bisect_left(posting, slot)]
+            if not posting:
+                del self.grams[gram]
+        self._records[slot] = None
+        self._texts[slot] = ()
+        self._last = None
+
+    def update(self, record):
+        """记录的名称或简介改变后调用，重新建立该记录的索引"""
+        self.remove(record)
+        self.add(record)
+
+    def search(self, query):
+        """返回任一字段包含 query 的记录，按加入顺序排列；query 为空时返回全部记录"""
+        query = query.lower()
+        if not query:
+            return [r for r in self._records if r is not None]
+        if len(query) <= self.n:
+            # 查询串本身就是索引中的片段，其槽位列表即是精确结果，不需要核对
+            slots = list(self.grams.get(query, ()))
+            self._last = (query, slots)
+            return [self._records[slot] for slot in slots]
+        if self._last is not None and self._last[0] in query:
+            # 包含上一次查询的串只可能出现在上一次的结果中
+            candidates = self._last[1]
         else:
-            right = mid - 1
+            candidates = ()
+            for start in range(len(query) - self.n + 1):
+                posting = self.grams.get(query[start:start + self.n])
+                if posting is None:
+                    candidates = ()
+                    break
+                if start == 0 or len(posting) < len(candidates):
+                    candidates = posting
+        slots = [slot for slot in candidates if any(query in text for text in self._texts[slot])]
+        self._last = (query, slots)
+        return [self._records[slot] for slot in slots]
+
+    def _grams_of(self, texts):
+        grams = set()
+        for text in texts:
+            for length in range(1, self.n + 1):
+                for start in range(len(text) - length + 1):
+                    grams.add(text[start:start + length])
+        return grams
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children = {}  # 下一个字母 -> 子节点
+        self.entries = []   # 拼音恰好到此为止的记录，元素为 (-热度, 序号, 记录)
+        self.top = []       # 子树中热度最高的至多 k 条记录，升序排列的 (-热度, 序号, 记录)
+
+class PinyinTrie:
+    """
+    名称拼音前缀树，支持用拼音首字母（如 "xxg" 查到潇湘馆）或全拼（如 "xiaoxiang"）的前缀查找，不区分大小写。
+    每个节点缓存子树中热度最高的 k 条记录，查询前 k 名只需走完前缀，耗时 O(前缀长度 + k)，不扫描整个目录；
+    需要更多结果时遍历前缀对应的子树。热度相同的记录按加入顺序排列。
+    记录可以是对象也可以是字典，name_field、score_field 指定名称和热度字段。
+    """
+
+    def __init__(self, records=(), name_field="name", score_field="heat", k=PINYIN_TOP_K):
+        self.name_field = name_field
+        self.score_field = score_field
+        self.k = k
+        self.root = _TrieNode()
+        self._entries = {}  # 记录的识别键 -> (拼音键, 条目)
+        self._next_seq = 0
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, record, seq=None):
+        if record_key(record) in self._entries:
+            raise ValueError(f"记录已在前缀树中: {record!r}")
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+        entry = (-(_field(record, self.score_field, 0) or 0), seq, record)
+        keys = self._keys_of(record)
+        self._entries[record_key(record)] = (keys, entry)
+        for key in keys:
+            node = self._push(self.root, entry)
+            for letter in key:
+                node = node.children.setdefault(letter, _TrieNode())
+                self._push(node, entry)
+            node.entries.append(entry)
+
+    def remove(self, record):
+        keys, entry = self._entries.pop(record_key(record))
+        for key in keys:
+            path = [self.root]
+            for letter in key:
+                path.append(path[-1].children[letter])
+            path[-1].entries.remove(entry)
+            # 自底向上重算路径上各节点的缓存，删掉变空的节点
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                if depth > 0 and not node.entries and not node.children:
+                    del path[depth - 1].children[key[depth - 1]]
+                else:
+                    self._refresh(node)
+
+    def update(self, record):
+        """记录的名称或热度改变后调用"""
+        seq = self._entries[record_key(record)][1][1]
+        self.remove(record)
+        self.add(record, seq)
+
+    def search(self, prefix, limit=None):
+        """返回拼音首字母或全拼以 prefix 开头的记录，按热度从高到低排列，limit 限制返回条数"""
+        node = self.root
+        for letter in prefix.strip().lower():
+            node = node.children.get(letter)
+            if node is None:
+                return []
+        if limit is not None and limit <= self.k:
+            return [entry[2] for entry in node.top[:limit]]
+        found = {}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for entry in current.entries:
+                found[entry[1]] = entry
+            stack.extend(current.children.values())
+        ranked = sorted(found.values(), key=lambda entry: entry[:2])
+        return [entry[2] for entry in ranked[:limit]]
+
+    def _keys_of(self, record):
+        name = str(_field(record, self.name_field, "") or "")
+        initials = chinese_to_pinyin_initials(name).lower()
+        full = "".join(lazy_pinyin(name)).lower()
+        return tuple(dict.fromkeys(key for key in (initials, full) if key))
+
+    def _push(self, node, entry):
+        # 同一条记录的首字母和全拼可能经过同一节点，只保留一份
+        if any(other[1] == entry[1] for other in node.top):
+            return node
+        if len(node.top) < self.k or entry[:2] < node.top[-1][:2]:
+            insort(node.top, entry, key=lambda other: other[:2])
+            del node.top[self.k:]
+        return node
+
+    def _refresh(self, node):
+        candidates = {entry[1]: entry for entry in node.entries}
+        for child in node.children.values():
+            for entry in child.top:
+                candidates[entry[1]] = entry
+        node.top = nsmallest(self.k, candidates.values(), key=lambda entry: entry[:2])
+
+def _text_tokens(text, query=False):
+    """
+    中文按字切分：文档中每段连续汉字同时产生单字和相邻两字组成的词，查询中两个字以上的一段只取两字词，
+    单独的一个字取单字；连续的字母数字作为一个词。字母不区分大小写。
+    """
+    tokens = []
+    for run in re.findall(r"[\u4e00-\u9fff]+|[0-9a-z]+", text.lower()):
+        if not "\u4e00" <= run[0] <= "\u9fff":
+            tokens.append(run)
+            continue
+        if not query or len(run) == 1:
+            tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+class FullTextIndex:
+    """
+    名称、简介、标签和花签词的 BM25 全文检索。各字段的词频按 boosts 加权后合并（即 BM25F 的简化形式），
+    文档长度同样按权重计算。查询时可以叠加热度先验 popularity_weight * 热度 / (热度 + popularity_pivot)。
+    前 k 名用 WAND 算法选出：倒排表按槽位升序排列，每个词有得分上界，按游标所在文档排序后累加上界，
+    累加值超过当前第 k 名得分之前的文档直接跳过，只对可能进入前 k 名的文档完整计分。
+    """
+
+    def __init__(self, records=(), boosts=None, k1=BM25_K1, b=BM25_B):
+        self.boosts = dict(FULLTEXT_BOOSTS if boosts is None else boosts)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # 词 -> (升序槽位列表, 对应的加权词频列表)
+        self.max_tf = {}    # 词 -> 出现过的最大加权词频，用于计算得分上界
+        self._records = []  # 槽位 -> 记录，删除后留空为 None
+        self._lengths = []  # 槽位 -> 加权文档长度
+        self._terms = []    # 槽位 -> 该文档包含的词，删除时使用
+        self._slots = {}    # 记录的识别键 -> 槽位
+        self._total_length = 0.0
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, record):
+        if record_key(record) in self._slots:
+            raise ValueError(f"记录已在索引中: {record!r}")
+        tf = {}
+        length = 0.0
+        for field, boost in self.boosts.items():
+            value = _field(record, field, "")
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            for token in _text_tokens(str(value or "")):
+                tf[token] = tf.get(token, 0.0) + boost
+                length += boost
+        slot = len(self._records)
+        self._slots[record_key(record)] = slot
+        self._records.append(record)
+        self._lengths.append(length)
+        self._terms.append(tuple(tf))
+        self._total_length += length
+        for token, weight in tf.items():
+            slots, weights = self.postings.setdefault(token, ([], []))
+            slots.append(slot)
+            weights.append(weight)
+            if weight > self.max_tf.get(token, 0.0):
+                self.max_tf[token] = weight
+
+    def remove(self, record):
+        slot = self._slots.pop(record_key(record))
+        for token in self._terms[slot]:
+            slots, weights = self.postings[token]
+            i = bisect_left(slots, slot)
+            del slots[i]
+            del weights[i]
+            if not slots:
+                del self.postings[token]
+                del self.max_tf[token]
+        # max_tf 不随删除减小，仍是有效的上界
+        self._total_length -= self._lengths[slot]
+        self._records[slot] = None
+        self._terms[slot] = ()
+
+    def update(self, record):
+        """记录的名称、简介、标签或花签词改变后调用"""
+        self.remove(record)
+        self.add(record)
+
+    def search(self, query, k=10, popularity_weight=0.0, popularity_field="heat", popularity_pivot=100.0):
+        """返回得分最高的至多 k 条 (记录, 得分)，得分从高到低，得分相同时先加入的在前"""
+        if k <= 0 or not self._slots:
+            return []
+        count = len(self._slots)
+        average = self._total_length / count or 1.0
+        k1, b = self.k1, self.b
+        # 每个词：[槽位列表, 词频列表, 游标, idf, 得分上界]
+        terms = []
+        for token in dict.fromkeys(_text_tokens(query, query=True)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            df = len(posting[0])
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            # 得分随词频增大、随文档长度减小，取最大词频和长度为 0 即得上界
+            tf = self.max_tf[token]
+            terms.append([posting[0], posting[1], 0, idf, idf * tf * (k1 + 1) / (tf + k1 * (1 - b))])
+        prior_bound = max(popularity_weight, 0.0)
+
+        heap = []  # 当前前 k 名，元素为 (得分, -槽位)，堆顶是第 k 名
+        while True:
+            terms = [t for t in terms if t[2] < len(t[0])]
+            if not terms:
+                break
+            terms.sort(key=lambda t: t[0][t[2]])
+            threshold = heap[0][0] if len(heap) >= k else -math.inf
+            bound = prior_bound
+            pivot = None
+            for i, t in enumerate(terms):
+                bound += t[4]
+                # 文档按槽位升序处理，得分与第 k 名相同的新文档排在它后面，因此要严格大于
+                if bound > threshold:
+                    pivot = i
+                    break
+            if pivot is None:
+                break
+            pivot_slot = terms[pivot][0][terms[pivot][2]]
+            if terms[0][0][terms[0][2]] != pivot_slot:
+                # 槽位小于 pivot_slot 的文档只可能含有 pivot 之前的词，得分上界不超过第 k 名，全部跳过
+                for t in terms[:pivot]:
+                    t[2] = bisect_left(t[0], pivot_slot, t[2])
+                continue
+            norm = k1 * (1 - b + b * self._lengths[pivot_slot] / average)
+            score = 0.0
+            for t in terms:
+                if t[0][t[2]] != pivot_slot:
+                    break
+                tf = t[1][t[2]]
+                score += t[3] * tf * (k1 + 1) / (tf + norm)
+                t[2] += 1
+            if popularity_weight:
+                heat = max(_field(self._records[pivot_slot], popularity_field, 0) or 0, 0)
+                score += popularity_weight * heat / (heat + popularity_pivot)
+            entry = (score, -pivot_slot)
+            if len(heap) < k:
+                heappush(heap, entry)
+            elif entry > heap[0]:
+                heapreplace(heap, entry)
+        ranked = sorted(heap, reverse=True)
+        return [(self._records[-slot], score) for score, slot in ranked]
+
+class _TagQueryParser:
+    """标签布尔表达式的递归下降解析器，直接在位图上求值"""
+
+    def __init__(self, tokens, by_tag, all_bits):
+        self.tokens = tokens
+        self.pos = 0
+        self.by_tag = by_tag
+        self.all_bits = all_bits
+
+    def parse(self):
+        bits = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"标签查询在“{self.tokens[self.pos]}”处无法解析")
+        return bits
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _or(self):
+        bits = self._and()
+        while self._peek() == "OR":
+            self.pos += 1
+            bits |= self._and()
+        return bits
+
+    def _and(self):
+        bits = self._not()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self.pos += 1
+            bits &= self._not()
+        return bits
+
+    def _not(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("标签查询不完整")
+        self.pos += 1
+        if token == "NOT":
+            return self.all_bits & ~self._not()
+        if token == "(":
+            bits = self._or()
+            if self._peek() != ")":
+                raise ValueError("标签查询缺少右括号")
+            self.pos += 1
+            return bits
+        if token in ("AND", "OR", ")"):
+            raise ValueError(f"标签查询在“{token}”处无法解析")
+        return self.by_tag.get(token, 0)
+
+# 默认景点目录，增删改景点请通过它进行，以保持索引与数据一致
+spot_catalog = SpotCatalog(all_spots)
+
+def find_spots(query, catalog=None, ranked=False, limit=10):
+    """
+    支持名称精确查找和标签模糊查找的景点检索。
+    ranked 为 True 时改为全文检索，返回按相关度排序的前 limit 个景点。
+    拼音前缀查找同样只返回热度最高的前 limit 个，limit 不超过 PINYIN_TOP_K 时直接读取前缀树节点的缓存。
+    """
+    catalog = catalog if catalog is not None else spot_catalog
+    if ranked:
+        return [spot for spot, _ in catalog.search_ranked(query, limit)]
+    
+    # 名称精确查找（哈希索引）
+    results = catalog.find_by_name(query)
     
+    # 名称没有命中时按标签查找，支持 "诗词文化 AND 水景建筑 NOT 冬日景观" 这样的多标签查询
     if not results:
-        for spot in all_spots:
-            if query in spot.tags:
-                results.append(spot)
+        try:
+            results = catalog.query_tags(query)
+        except ValueError:
+            results = []
+    
+    # 输入的是字母时按拼音首字母或全拼前缀查找，如 "xxg" 查到潇湘馆
+    if not results and query.isascii() and query.isalpha():
+        results = catalog.search_pinyin(query, limit)
     
     # 去重处理（防止同名或重复标签）
     seen_ids = set()
@@ -81,6 +770,15 @@ def display_spots(spots):
         print(f"{spot.name:<8} | {spot.description[:16]:<20} | {spot.heat:<6} | {str(spot.flower)[:14]:<18} | {spot.visit_count:<8}")
 
 if __name__ == "__main__":
+    from Sorting import Sorter, SortedView
+
+    # 列式存储示例：每次取行得到的都是新的 SpotRow 视图，有序视图仍能找到同一行
+    table = SpotTable(all_spots)
+    view = SortedView(Sorter(key=lambda row: row.visit_count, reverse=True), table)
+    table[5].visit_count += 1
+    assert view.update(table[5]) == 0 and view[0] == table[5] and table[5] in view
+    print(f"{table[5].name} 的浏览人次增加后排在第 {view.index(table[5]) + 1} 位")
+
     # 查找示例
     query = input("请输入要查找的景点名称或关键词：")
     found_spots = find_spots(query)
@@ -0,0 +1,223 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from Sorting import (
+    Sorter, GrandViewGardenSpot, chinese_to_pinyin_initials, clear_pinyin_cache,
+    InsertionSortStrategy, BubbleSortStrategy, SelectionSortStrategy, QuickSortStrategy,
+    MergeSortStrategy, IntroSortStrategy, RadixSortStrategy, AutoSortStrategy, VectorizedSortStrategy
+)
+
+# 参与测试的排序策略
+STRATEGIES = {
+    "insertion": InsertionSortStrategy,
+    "bubble": BubbleSortStrategy,
+    "selection": SelectionSortStrategy,
+    "quick": QuickSortStrategy,
+    "merge": MergeSortStrategy,
+    "intro": IntroSortStrategy,
+    "radix": RadixSortStrategy,
+    "auto": AutoSortStrategy,
+    "vectorized": VectorizedSortStrategy,
+}
+# O(n^2) 策略允许的最大规模，超过时跳过，避免一次测试跑上几个小时
+SIZE_LIMITS = {
+    "insertion": 10000,
+    "bubble": 10000,
+    "selection": 10000,
+}
+# 关键字：int 取游览人次（几乎没有计算代价），pinyin 取名称拼音首字母（需要查拼音，代价高）
+KEYS: Dict[str, Callable[[Any], Any]] = {
+    "int": lambda spot: spot.visits,
+    "pinyin": lambda spot: chinese_to_pinyin_initials(spot.name),
+}
+DISTRIBUTIONS = ["random", "sorted", "reversed", "duplicates", "nearly_sorted"]
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+# 生成景点名称用的汉字
+NAME_CHARS = "怡红院潇湘馆蘅芜苑稻香村栊翠庵凹晶溪馆紫菱洲藕香榭秋爽斋缀锦阁蓼风轩暖香坞省亲别墅沁芳亭大观楼"
+
+
+def make_dataset(size: int, distribution: str, key_name: str, seed: int = 0) -> List[GrandViewGardenSpot]:
+    """
+    生成测试数据。duplicates 分布只有 10 种不同的关键字；sorted、reversed 按所测关键字排好序；
+    nearly_sorted 在有序的基础上随机交换约 1% 的相邻元素。
+    """
+    rng = random.Random(seed)
+    if distribution == "duplicates":
+        names = ["".join(rng.choice(NAME_CHARS) for _ in range(3)) for _ in range(10)]
+        spots = [GrandViewGardenSpot(rng.choice(names), rng.randint(1, 5), rng.randint(0, 9))
+                 for _ in range(size)]
+    else:
+        spots = [GrandViewGardenSpot("".join(rng.choice(NAME_CHARS) for _ in range(rng.randint(2, 5))),
+                                     rng.randint(1, 5), rng.randint(0, 10 * size))
+                 for _ in range(size)]
+    key = KEYS[key_name]
+    if distribution in ("sorted", "reversed", "nearly_sorted"):
+        spots.sort(key=key, reverse=distribution == "reversed")
+    if distribution == "nearly_sorted" and size > 1:
+        for _ in range(max(1, size // 100)):
+            i = rng.randrange(size - 1)
+            spots[i], spots[i + 1] = spots[i + 1], spots[i]
+    return spots
+
+
+def run_case(strategy_name: str, spots: List[GrandViewGardenSpot], key_name: str,
+             repeat: int = 3, trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    用指定策略对同一份数据排序 repeat 次，记录最短耗时、关键字调用次数、比较次数，
+    并在 tracemalloc 下额外运行一次记录峰值内存（不计入耗时）。每次运行前清空拼音缓存，测的是冷启动代价。
+    """
+    key = KEYS[key_name]
+    calls = 0
+
+    def counted_key(spot):
+        nonlocal calls
+        calls += 1
+        return key(spot)
+
+    strategy = STRATEGIES[strategy_name]()
+    expected = sorted(key(spot) for spot in spots)
+    best = None
+    result = []
+    for _ in range(repeat):
+        clear_pinyin_cache()
+        calls = 0
+        start = time.perf_counter()
+        result = Sorter(strategy, counted_key).sort(spots)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    record = {
+        "strategy": strategy_name,
+        "size": len(spots),
+        "key": key_name,
+        "seconds": best,
+        "key_calls": calls,
+        "comparisons": strategy.comparisons,
+        "correct": [key(spot) for spot in result] == expected,
+    }
+    if isinstance(strategy, AutoSortStrategy):
+        record["choice"] = strategy.choice
+    if isinstance(strategy, VectorizedSortStrategy):
+        record["backend"] = strategy.backend
+    if isinstance(strategy, RadixSortStrategy):
+        record["method"] = strategy.method
+
+    if trace_memory:
+        clear_pinyin_cache()
+        tracemalloc.start()
+        try:
+            Sorter(strategy, key).sort(spots)
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def run_benchmark(sizes: List[int], distributions: List[str], key_names: List[str], strategy_names: List[str],
+                  repeat: int = 3, trace_memory: bool = True, seed: int = 0,
+                  log: Optional[Callable[[str], None]] = print) -> Dict[str, Any]:
+    """运行所有组合，返回可直接保存为 JSON 的结果。超过 SIZE_LIMITS 的组合记录为跳过。"""
+    results = []
+    for size in sizes:
+        for distribution in distributions:
+            for key_name in key_names:
+                spots = make_dataset(size, distribution, key_name, seed)
+                for strategy_name in strategy_names:
+                    limit = SIZE_LIMITS.get(strategy_name)
+                    if limit is not None and size > limit:
+                        record = {"strategy": strategy_name, "size": size, "key": key_name,
+                                  "skipped": f"规模超过 {limit}"}
+                    else:
+                        record = run_case(strategy_name, spots, key_name, repeat, trace_memory)
+                    record["distribution"] = distribution
+                    results.append(record)
+                    if log is not None:
+                        log(format_record(record))
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    head = f"{record['strategy']:<10} n={record['size']:<8} {record['distribution']:<13} {record['key']:<6}"
+    if "skipped" in record:
+        return f"{head} 跳过（{record['skipped']}）"
+    text = (f"{head} {record['seconds'] * 1000:10.2f} ms  关键字 {record['key_calls']:>8}  "
+            f"比较 {record['comparisons']:>10}")
+    if "peak_bytes" in record:
+        text += f"  峰值内存 {record['peak_bytes'] / 1024:10.1f} KiB"
+    if not record["correct"]:
+        text += "  结果错误!"
+    return text
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """
+    比较两次测试结果，返回耗时或峰值内存比旧结果高出 tolerance 以上、比较次数增加或结果出错的组合。
+    """
+    def case(record):
+        return record["strategy"], record["size"], record["distribution"], record["key"]
+
+    previous = {case(r): r for r in old["results"] if "skipped" not in r}
+    regressions = []
+    for record in new["results"]:
+        before = previous.get(case(record))
+        if before is None or "skipped" in record:
+            continue
+        name = "/".join(str(x) for x in case(record))
+        if not record["correct"]:
+            regressions.append(f"{name}: 排序结果错误")
+        if record["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: 耗时 {before['seconds']:.4f}s -> {record['seconds']:.4f}s")
+        if record["comparisons"] > before["comparisons"]:
+            regressions.append(f"{name}: 比较次数 {before['comparisons']} -> {record['comparisons']}")
+        if "peak_bytes" in record and "peak_bytes" in before \
+                and record["peak_bytes"] > before["peak_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: 峰值内存 {before['peak_bytes']} -> {record['peak_bytes']} 字节")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="排序策略性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=DISTRIBUTIONS)
+    parser.add_argument("--keys", nargs="+", choices=list(KEYS), default=list(KEYS))
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="不测峰值内存（tracemalloc 会额外运行一次）")
+    parser.add_argument("--output", default="sort_benchmark.json", help="结果保存路径")
+    parser.add_argument("--compare", help="与之前保存的结果比较，有退化时返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="耗时和内存允许的相对增幅")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.distributions, args.keys, args.strategies,
+                           args.repeat, not args.no_memory, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare_results(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print("退化:", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,77 @@
-from typing import List, Callable, Any
+import heapq
+import math
+import os
+import pickle
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import List, Callable, Any, Iterable, Iterator, Optional, Sequence
 from pypinyin import lazy_pinyin # 需要安装pypinyin 这里用的是0.53.0
 
+try:
+    import numpy as np  # 可选依赖，VectorizedSortStrategy 用它做向量化排序
+except ImportError:
+    np = None
+
+# 拼音首字母缓存最多保存的名称个数
+PINYIN_CACHE_SIZE = 4096
+# 内省排序中区间长度不超过该值时留给最后的插入排序处理
+INSERTION_CUTOFF = 16
+# 基数排序每一趟处理的二进制位数（桶数为 2 的该次方）
+RADIX_BITS = 8
+# LSD 基数排序的趟数超过 log2(n) 的该倍数时改用归并排序（关键字范围很宽时逐趟分桶反而比比较排序慢）
+RADIX_PASS_FACTOR = 0.6
+# MSD 基数排序中不超过该长度的桶改用插入排序
+MSD_CUTOFF = 16
+# 自动策略：不超过该长度的输入直接用插入排序
+AUTO_SMALL_LIMIT = 32
+# 自动策略：估计关键字类型和重复程度时抽取的样本数
+AUTO_SAMPLE_SIZE = 256
+# 外部排序：每个顺串（内存中排好序后写入临时文件的一段）默认包含的记录数
+EXTERNAL_CHUNK_SIZE = 100000
+# 外部排序：顺串文件中每次 pickle 的记录条数
+RUN_BATCH_SIZE = 1024
+
 # 排序策略基类
 class SortStrategy:
     """
-    定义了排序策略的接口，子类需要实现sort方法。
+    定义了排序策略的接口。sort 先为每个元素计算且只计算一次关键字，存入与元素平行的关键字数组（装饰），
+    再由子类的 sort_keys 在关键字数组上排序并同步移动元素，最后返回排好序的元素（去装饰）。
+    key_calls 和 comparisons 记录最近一次排序调用关键字函数和比较关键字的次数。
     """
 
+    def __init__(self):
+        self.key_calls = 0
+        self.comparisons = 0
+
     def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
         """
-        排序方法，需要子类实现。
+        排序方法。
 
         :param data: 要排序的数据列表。
         :param key: 一个函数，用于从每个元素中提取一个用于比较的关键字。
         :param reverse: 如果为True，则排序结果将按降序排列；否则按升序排列。
         :return: 排序后的数据列表。
         """
+        items = list(data)
+        keys = [key(x) for x in items]
+        self.key_calls = len(items)
+        self.comparisons = 0
+        self.sort_keys(keys, items, reverse)
+        return items
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        """
+        在关键字数组上原地排序，并对元素数组做同样的移动，需要子类实现。
+
+        :param keys: 每个元素的关键字，与 items 一一对应。
+        :param items: 要排序的元素。
+        :param reverse: 如果为True，则按降序排列；否则按升序排列。
+        """
         raise NotImplementedError("Subclasses must implement this method")
 
 
@@ -25,19 +81,20 @@ class InsertionSortStrategy(SortStrategy):
     实现了插入排序算法的策略类，适合部分有序的数据。
     """
 
-    def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
-        sorted_data = list(data)
-        for i in range(1, len(sorted_data)):
-            current = sorted_data[i]
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        comparisons = 0
+        for i in range(1, len(keys)):
+            current_key, current = keys[i], items[i]
             j = i - 1
             # 将当前元素插入到已排序部分的正确位置
-            while j >= 0 and (
-                    (key(sorted_data[j]) > key(current)) if not reverse else (key(sorted_data[j]) < key(current))
-            ):
-                sorted_data[j + 1] = sorted_data[j]
+            while j >= 0:
+                comparisons += 1
+                if not ((keys[j] > current_key) if not reverse else (keys[j] < current_key)):
+                    break
+                keys[j + 1], items[j + 1] = keys[j], items[j]
                 j -= 1
-            sorted_data[j + 1] = current
-        return sorted_data
+            keys[j + 1], items[j + 1] = current_key, current
+        self.comparisons = comparisons
 
 
 # 冒泡排序策略类
@@ -46,22 +103,22 @@ class BubbleSortStrategy(SortStrategy):
     实现了冒泡排序算法的策略类，适合小数据集。
     """
 
-    def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
-        sorted_data = list(data)
-        n = len(sorted_data)
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        comparisons = 0
+        n = len(keys)
         for i in range(n):
             swapped = False
             for j in range(n - i - 1):
                 # 比较相邻元素并根据reverse参数决定排序顺序
-                condition = (key(sorted_data[j]) > key(sorted_data[j + 1])) if not reverse else (
-                            key(sorted_data[j]) < key(sorted_data[j + 1]))
-                if condition:
-                    sorted_data[j], sorted_data[j + 1] = sorted_data[j + 1], sorted_data[j]
+                comparisons += 1
+                if (keys[j] > keys[j + 1]) if not reverse else (keys[j] < keys[j + 1]):
+                    keys[j], keys[j + 1] = keys[j + 1], keys[j]
+                    items[j], items[j + 1] = items[j + 1], items[j]
                     swapped = True
             # 如果没有发生交换，说明列表已经有序，可以提前退出循环
             if not swapped:
                 break
-        return sorted_data
+        self.comparisons = comparisons
 
 
 # 选择排序策略类
@@ -70,43 +127,519 @@ class SelectionSortStrategy(SortStrategy):
     实现了选择排序算法的策略类，适合简单场景。
     """
 
-    def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
-        sorted_data = list(data)
-        n = len(sorted_data)
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        comparisons = 0
+        n = len(keys)
         for i in range(n):
             extrema = i
             for j in range(i + 1, n):
                 # 找到最小（或最大）元素的位置
-                if (key(sorted_data[j]) < key(sorted_data[extrema])) if not reverse else (
-                        key(sorted_data[j]) > key(sorted_data[extrema])):
+                comparisons += 1
+                if (keys[j] < keys[extrema]) if not reverse else (keys[j] > keys[extrema]):
                     extrema = j
             # 将找到的最小（或最大）元素与当前位置交换
-            sorted_data[i], sorted_data[extrema] = sorted_data[extrema], sorted_data[i]
-        return sorted_data
+            keys[i], keys[extrema] = keys[extrema], keys[i]
+            items[i], items[extrema] = items[extrema], items[i]
+        self.comparisons = comparisons
 
 
 # 快速排序策略类
 class QuickSortStrategy(SortStrategy):
     """快速排序策略（适合大数据量）"""
 
-    def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
-        if len(data) <= 1:
-            return list(data)
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        self.comparisons = 0
+        keys[:], items[:] = self._quick_sort(keys, items, reverse)
 
-        pivot = data[len(data) // 2]
-        pivot_key = key(pivot)
-        left, middle, right = [], [], []
+    def _quick_sort(self, keys: List[Any], items: List[Any], reverse: bool):
+        if len(keys) <= 1:
+            return list(keys), list(items)
 
-        for x in data:
-            x_key = key(x)
+        pivot_key = keys[len(keys) // 2]
+        left_keys, left, middle_keys, middle, right_keys, right = [], [], [], [], [], []
+
+        for x_key, x in zip(keys, items):
+            self.comparisons += 1
             if x_key == pivot_key:
+                middle_keys.append(x_key)
                 middle.append(x)
             elif (x_key < pivot_key and not reverse) or (x_key > pivot_key and reverse):
+                left_keys.append(x_key)
                 left.append(x)
             else:
+                right_keys.append(x_key)
                 right.append(x)
 
-        return self.sort(left, key, reverse) + middle + self.sort(right, key, reverse)
+        left_keys, left = self._quick_sort(left_keys, left, reverse)
+        right_keys, right = self._quick_sort(right_keys, right, reverse)
+        return left_keys + middle_keys + right_keys, left + middle + right
+
+
+# 归并排序策略类
+class MergeSortStrategy(SortStrategy):
+    """
+    自底向上（非递归）的归并排序策略，稳定，时间复杂度 O(n log n)。
+    只额外分配一组与输入等长的缓冲区，各趟归并在输入数组与缓冲区之间来回进行，适合大数据量。
+    """
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        comparisons = 0
+        n = len(keys)
+        src_keys, src_items = keys, items
+        dst_keys, dst_items = [None] * n, [None] * n
+        width = 1
+        while width < n:
+            for lo in range(0, n, 2 * width):
+                mid = min(lo + width, n)
+                hi = min(lo + 2 * width, n)
+                # 两段已经有序时直接复制，部分有序的数据可以省去大量比较
+                if mid < hi:
+                    comparisons += 1
+                if mid >= hi or not ((src_keys[mid] < src_keys[mid - 1]) if not reverse
+                                     else (src_keys[mid] > src_keys[mid - 1])):
+                    dst_keys[lo:hi] = src_keys[lo:hi]
+                    dst_items[lo:hi] = src_items[lo:hi]
+                    continue
+                i, j, k = lo, mid, lo
+                while i < mid and j < hi:
+                    comparisons += 1
+                    # 只有右段元素严格在前时才先取右段，保证稳定
+                    if (src_keys[j] < src_keys[i]) if not reverse else (src_keys[j] > src_keys[i]):
+                        dst_keys[k], dst_items[k] = src_keys[j], src_items[j]
+                        j += 1
+                    else:
+                        dst_keys[k], dst_items[k] = src_keys[i], src_items[i]
+                        i += 1
+                    k += 1
+                if i < mid:
+                    dst_keys[k:hi] = src_keys[i:mid]
+                    dst_items[k:hi] = src_items[i:mid]
+                else:
+                    dst_keys[k:hi] = src_keys[j:hi]
+                    dst_items[k:hi] = src_items[j:hi]
+            src_keys, dst_keys = dst_keys, src_keys
+            src_items, dst_items = dst_items, src_items
+            width *= 2
+        if src_keys is not keys:
+            keys[:] = src_keys
+            items[:] = src_items
+        self.comparisons = comparisons
+
+
+# 内省排序策略类
+class IntroSortStrategy(SortStrategy):
+    """
+    内省排序策略：原地快速排序（三数取中选主元、Hoare 划分），递归深度超过 2log2(n) 时改用堆排序，
+    长度不超过 INSERTION_CUTOFF 的区间最后统一用插入排序完成。不稳定，除关键字数组外不需要额外内存。
+    """
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        comparisons = 0
+
+        def before(a, b):
+            nonlocal comparisons
+            comparisons += 1
+            return a > b if reverse else a < b
+
+        n = len(keys)
+        if n > 1:
+            self._introsort(keys, items, 0, n, 2 * int(math.log2(n)), before)
+            self._insertion_sort(keys, items, before)
+        self.comparisons = comparisons
+
+    def _introsort(self, keys, items, lo, hi, depth, before):
+        # 对 [lo, hi) 排序；只对较短的一侧递归，较长的一侧继续循环，栈深度为 O(log n)
+        while hi - lo > INSERTION_CUTOFF:
+            if depth == 0:
+                self._heap_sort(keys, items, lo, hi, before)
+                return
+            depth -= 1
+            p = self._partition(keys, items, lo, hi, before)
+            if p - lo < hi - p:
+                self._introsort(keys, items, lo, p, depth, before)
+                lo = p
+            else:
+                self._introsort(keys, items, p, hi, depth, before)
+                hi = p
+
+    @staticmethod
+    def _partition(keys, items, lo, hi, before):
+        # 三数取中：使 keys[lo] <= keys[mid] <= keys[hi - 1]，以 keys[mid] 为主元做 Hoare 划分
+        mid = lo + (hi - lo - 1) // 2
+        last = hi - 1
+        if before(keys[mid], keys[lo]):
+            keys[lo], keys[mid] = keys[mid], keys[lo]
+            items[lo], items[mid] = items[mid], items[lo]
+        if before(keys[last], keys[mid]):
+            keys[mid], keys[last] = keys[last], keys[mid]
+            items[mid], items[last] = items[last], items[mid]
+            if before(keys[mid], keys[lo]):
+                keys[lo], keys[mid] = keys[mid], keys[lo]
+                items[lo], items[mid] = items[mid], items[lo]
+        pivot = keys[mid]
+        i, j = lo - 1, hi
+        while True:
+            i += 1
+            while before(keys[i], pivot):
+                i += 1
+            j -= 1
+            while before(pivot, keys[j]):
+                j -= 1
+            if i >= j:
+                return j + 1
+            keys[i], keys[j] = keys[j], keys[i]
+            items[i], items[j] = items[j], items[i]
+
+    @staticmethod
+    def _heap_sort(keys, items, lo, hi, before):
+        # 在 [lo, hi) 上建立“最靠后”元素在堆顶的堆，再依次把堆顶换到区间末尾
+        def sift_down(root, end):
+            while True:
+                child = 2 * (root - lo) + 1 + lo
+                if child >= end:
+                    return
+                if child + 1 < end and before(keys[child], keys[child + 1]):
+                    child += 1
+                if not before(keys[root], keys[child]):
+                    return
+                keys[root], keys[child] = keys[child], keys[root]
+                items[root], items[child] = items[child], items[root]
+                root = child
+
+        for start in range(lo + (hi - lo) // 2 - 1, lo - 1, -1):
+            sift_down(start, hi)
+        for end in range(hi - 1, lo, -1):
+            keys[lo], keys[end] = keys[end], keys[lo]
+            items[lo], items[end] = items[end], items[lo]
+            sift_down(lo, end)
+
+    @staticmethod
+    def _insertion_sort(keys, items, before):
+        for i in range(1, len(keys)):
+            current_key, current = keys[i], items[i]
+            j = i - 1
+            while j >= 0 and before(current_key, keys[j]):
+                keys[j + 1], items[j + 1] = keys[j], items[j]
+                j -= 1
+            keys[j + 1], items[j + 1] = current_key, current
+
+
+# 基数排序策略类
+class RadixSortStrategy(SortStrategy):
+    """
+    基数排序策略，不比较关键字，时间与数据量成线性关系：
+    - 整数关键字取值范围不超过 max(2^RADIX_BITS, 2n) 时用计数排序；
+    - 其余整数关键字减去最小值后做 LSD 基数排序，每趟按 RADIX_BITS 位分桶；
+      趟数超过 RADIX_PASS_FACTOR * log2(n)（如 20 万个 128 位哈希值）时改用归并排序；
+    - 字符串关键字（如拼音首字母）做 MSD 基数排序，逐字符分桶，小桶改用插入排序。
+    各趟分桶都保持原有顺序，因此排序稳定；reverse 时按相反的桶顺序收集。
+    关键字不全是整数或不全是字符串时改用归并排序。最近一次使用的方法记录在 method 中。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.method = None
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        n = len(keys)
+        types = {type(k) for k in keys}
+        if n <= 1:
+            self.method = "none"
+            return
+        if types == {int}:
+            low, high = min(keys), max(keys)
+            passes = -(-(high - low).bit_length() // RADIX_BITS)
+            if high - low < max(1 << RADIX_BITS, 2 * n):
+                self.method = "counting"
+                order = self._counting_order(keys, low, high, reverse)
+            elif passes <= RADIX_PASS_FACTOR * n.bit_length():
+                self.method = "lsd"
+                order = self._lsd_order(keys, low, high, reverse)
+            else:
+                order = None
+        elif types == {str}:
+            self.method = "msd"
+            order = self._msd_order(keys, reverse)
+        else:
+            order = None
+        if order is None:
+            self.method = "merge"
+            merge = MergeSortStrategy()
+            merge.sort_keys(keys, items, reverse)
+            self.comparisons = merge.comparisons
+            return
+        gather = itemgetter(*order)
+        keys[:] = gather(keys)
+        items[:] = gather(items)
+
+    @staticmethod
+    def _counting_order(keys, low, high, reverse):
+        buckets = [[] for _ in range(high - low + 1)]
+        for i, k in enumerate(keys):
+            buckets[k - low].append(i)
+        if reverse:
+            buckets.reverse()
+        return [i for bucket in buckets for i in bucket]
+
+    @staticmethod
+    def _lsd_order(keys, low, high, reverse):
+        values = [k - low for k in keys]
+        mask = (1 << RADIX_BITS) - 1
+        order = range(len(keys))
+        shift = 0
+        while (high - low) >> shift:
+            buckets = [[] for _ in range(mask + 1)]
+            for i in order:
+                buckets[(values[i] >> shift) & mask].append(i)
+            if reverse:
+                buckets.reverse()
+            order = [i for bucket in buckets for i in bucket]
+            shift += RADIX_BITS
+        return list(order)
+
+    @staticmethod
+    def _msd_order(keys, reverse):
+        # 栈中保存 (下标段, 已经相同的前缀长度)，前缀长度为 None 表示该段已经有序；
+        # 先处理的段排在前面，因此子桶倒序入栈
+        order = []
+        stack = [(list(range(len(keys))), 0)]
+        while stack:
+            segment, depth = stack.pop()
+            if depth is None:
+                order.extend(segment)
+                continue
+            if len(segment) <= MSD_CUTOFF:
+                for pos in range(1, len(segment)):
+                    current = segment[pos]
+                    k = keys[current]
+                    j = pos - 1
+                    while j >= 0 and ((k > keys[segment[j]]) if reverse else (k < keys[segment[j]])):
+                        segment[j + 1] = segment[j]
+                        j -= 1
+                    segment[j + 1] = current
+                order.extend(segment)
+                continue
+            finished = []  # 长度恰为 depth 的关键字，彼此完全相同
+            buckets = {}
+            for i in segment:
+                k = keys[i]
+                if len(k) == depth:
+                    finished.append(i)
+                else:
+                    buckets.setdefault(k[depth], []).append(i)
+            parts = [(buckets[ch], depth + 1) for ch in sorted(buckets, reverse=reverse)]
+            if finished:
+                # 较短的关键字是较长关键字的前缀，升序时排在前面，降序时排在后面
+                if reverse:
+                    parts.append((finished, None))
+                else:
+                    parts.insert(0, (finished, None))
+            stack.extend(reversed(parts))
+        return order
+
+
+# 自适应排序策略类
+class AutoSortStrategy(SortStrategy):
+    """
+    自适应排序策略：先测量输入规模、有序程度（逆序相邻对个数）和关键字类型，再选择合适的算法：
+    - 很短的输入用插入排序；
+    - 已有序或只有少数逆序段的输入先尝试限定移动次数的插入排序，超出预算再转入归并排序；
+    - 整数和字符串关键字用基数排序（计数排序、LSD 或 MSD）；
+    - 浮点数关键字且重复值很多时用三路快速排序；
+    - 其余情况（字符串、元组等比较代价较高的关键字）用比较次数最少的归并排序。
+    所选算法都是稳定的。最近一次的选择、原因和测量结果记录在 choice、reason、profile 中，便于核查。
+    每个元素的关键字只计算一次，关键字函数的耗时与所选算法无关，因此只记入 profile["key_cost"] 供核查，不参与选择。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.choice = None
+        self.reason = ""
+        self.profile = {}
+        self._key_cost = None
+        self._strategies = {
+            "insertion": InsertionSortStrategy(),
+            "merge": MergeSortStrategy(),
+            "quick": QuickSortStrategy(),
+            "radix": RadixSortStrategy(),
+        }
+
+    def sort(self, data: List[Any], key: Callable[[Any], Any], reverse: bool) -> List[Any]:
+        items = list(data)
+        start = time.perf_counter()
+        keys = [key(x) for x in items]
+        # 关键字只计算一次，耗时记入测量结果，供核查时判断关键字函数是否过重
+        self._key_cost = (time.perf_counter() - start) / len(items) if items else 0.0
+        self.key_calls = len(items)
+        self.comparisons = 0
+        self.sort_keys(keys, items, reverse)
+        return items
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        n = len(keys)
+        descents = self._count_descents(keys, reverse)
+        sample = keys[::max(1, n // AUTO_SAMPLE_SIZE)]
+        key_type = self._key_type(sample)
+        self.profile = {
+            "size": n,
+            "descents": descents,
+            "key_type": key_type,
+            "key_cost": self._key_cost,
+        }
+        self._key_cost = None
+        comparisons = max(0, n - 1)
+
+        if n <= AUTO_SMALL_LIMIT:
+            name, reason = "insertion", f"输入只有 {n} 个元素"
+        elif descents == 0:
+            self._record("insertion", "输入已有序，扫描一遍即可", comparisons)
+            return
+        elif descents <= math.log2(n):
+            # 逆序段很少时插入排序接近线性，但少数元素移动很远时会退化，因此限定移动次数
+            budget = 4 * n
+            done, used = self._bounded_insertion(keys, items, reverse, budget)
+            comparisons += used
+            if done:
+                self._record("insertion", f"只有 {descents} 处逆序，插入排序在预算内完成", comparisons)
+                return
+            name, reason = "merge", f"只有 {descents} 处逆序，但插入排序移动超出 {budget} 次预算"
+        elif key_type in ("int", "str"):
+            name, reason = "radix", f"{key_type} 关键字可以逐位分桶，不需要比较"
+        elif key_type == "float" and len(set(sample)) * 2 <= len(sample):
+            self.profile["distinct_ratio"] = len(set(sample)) / len(sample)
+            name, reason = "quick", "数值关键字重复值多，三路划分可以一次排除所有相等元素"
+        else:
+            name, reason = "merge", f"{key_type} 关键字无序输入，归并排序比较次数最少且稳定"
+
+        strategy = self._strategies[name]
+        strategy.sort_keys(keys, items, reverse)
+        if name == "radix":
+            self.profile["radix_method"] = strategy.method
+            if strategy.method == "merge":
+                reason += "；但整数关键字范围过宽（趟数过多）或样本之外有其他类型的关键字，基数排序已改用归并排序"
+        self._record(name, reason, comparisons + strategy.comparisons)
+
+    def _record(self, name, reason, comparisons):
+        self.choice = type(self._strategies[name]).__name__
+        self.reason = reason
+        self.comparisons = comparisons
+
+    @staticmethod
+    def _count_descents(keys, reverse):
+        # 相邻两元素顺序颠倒的次数，即输入被分成的有序段数减一
+        if reverse:
+            return sum(1 for i in range(len(keys) - 1) if keys[i] < keys[i + 1])
+        return sum(1 for i in range(len(keys) - 1) if keys[i + 1] < keys[i])
+
+    @staticmethod
+    def _key_type(sample):
+        types = {type(k) for k in sample}
+        if not types:
+            return "empty"
+        if types == {int}:
+            return "int"
+        if types <= {int, float}:
+            return "float"
+        if len(types) == 1:
+            return next(iter(types)).__name__
+        return "mixed"
+
+    @staticmethod
+    def _bounded_insertion(keys, items, reverse, budget):
+        """
+        最多移动 budget 次元素的插入排序。超出预算时立即停止，此时数组仍是原输入的一个排列，
+        可以交给其他算法继续排序。返回 (是否完成, 比较次数)。
+        """
+        comparisons = 0
+        moves = 0
+        for i in range(1, len(keys)):
+            current_key, current = keys[i], items[i]
+            j = i - 1
+            while j >= 0:
+                comparisons += 1
+                if not ((current_key < keys[j]) if not reverse else (current_key > keys[j])):
+                    break
+                keys[j + 1], items[j + 1] = keys[j], items[j]
+                j -= 1
+                moves += 1
+            keys[j + 1], items[j + 1] = current_key, current
+            if moves > budget:
+                return False, comparisons
+        return True, comparisons
+
+
+# 向量化排序策略类
+class VectorizedSortStrategy(SortStrategy):
+    """
+    向量化排序策略：把关键字一次性装入 NumPy 数组，用稳定的 argsort（单关键字）或 lexsort（组合关键字）
+    求出排列，再按排列取出元素，适合几十万条记录按热度、游览人数等数值关键字排名。
+    关键字函数返回元组时视为组合关键字，descending 依次给出每一列是否降序（再与 reverse 叠加），例如
+    Sorter(VectorizedSortStrategy(descending=(True, True, False)),
+           key=lambda s: (s.popularity, s.visits, chinese_to_pinyin_initials(s.name)))
+    表示热度降序、游览人数降序、拼音首字母升序。
+    只支持整数、浮点数和字符串列；没有安装 NumPy 或关键字类型不支持时，改用归并排序逐列做稳定排序，结果相同。
+    最近一次排序使用的实现记录在 backend 中（"numpy" 或 "python"）。
+    """
+
+    def __init__(self, descending: Optional[Sequence[bool]] = None):
+        super().__init__()
+        self.descending = tuple(descending) if descending is not None else None
+        self.backend = None
+
+    def sort_keys(self, keys: List[Any], items: List[Any], reverse: bool) -> None:
+        if not keys:
+            self.backend = "numpy" if np is not None else "python"
+            return
+        if isinstance(keys[0], tuple):
+            columns = [[k[c] for k in keys] for c in range(len(keys[0]))]
+        else:
+            columns = [keys]
+        flags = self.descending if self.descending is not None else (False,) * len(columns)
+        if len(flags) != len(columns):
+            raise ValueError(f"descending 给出了 {len(flags)} 列的方向，但关键字有 {len(columns)} 列")
+        flags = [bool(desc) != reverse for desc in flags]
+
+        order = self._numpy_order(columns, flags) if np is not None else None
+        if order is not None:
+            self.backend = "numpy"
+        else:
+            self.backend = "python"
+            order = self._python_order(columns, flags)
+        if len(order) > 1:
+            gather = itemgetter(*order)
+            keys[:] = gather(keys)
+            items[:] = gather(items)
+
+    @staticmethod
+    def _numpy_order(columns, flags):
+        arrays = []
+        for column, desc in zip(columns, flags):
+            array = np.asarray(column)
+            if array.dtype.kind not in "iufU":
+                return None  # 例如超出 int64 范围的整数、None 或其他对象
+            if array.dtype.kind == "U" and not all(type(x) is str for x in column):
+                return None  # 数字与字符串混合时 NumPy 会把数字转成字符串，比较结果与 Python 不同
+            if desc or array.dtype.kind == "U":
+                # 换成名次编码：字符串列可以参与 lexsort，降序列取相反数即可
+                codes = np.unique(array, return_inverse=True)[1].reshape(-1)
+                array = -codes if desc else codes
+            arrays.append(array)
+        if len(arrays) == 1:
+            order = np.argsort(arrays[0], kind="stable")
+        else:
+            # lexsort 以最后一列为第一关键字
+            order = np.lexsort(arrays[::-1])
+        return order.tolist()
+
+    def _python_order(self, columns, flags):
+        # 从最次要的列开始逐列做稳定排序，最后一趟按第一关键字排序
+        merge = MergeSortStrategy()
+        order = list(range(len(columns[0])))
+        for column, desc in reversed(list(zip(columns, flags))):
+            column_keys = [column[i] for i in order]
+            merge.sort_keys(column_keys, order, desc)
+            self.comparisons += merge.comparisons
+        return order
 
 
 # 排序器类，支持策略模式
@@ -117,11 +650,12 @@ class Sorter:
 
     def __init__(
             self,
-            strategy: SortStrategy = InsertionSortStrategy(),  # 默认排序策略为插入排序
+            strategy: Optional[SortStrategy] = None,  # 默认按输入特点自动选择排序算法（每个排序器各用一个实例）
             key: Callable[[Any], Any] = lambda x: x,  # 默认键函数为身份函数
             reverse: bool = False  # 默认排序顺序为升序
     ):
-        self.strategy = strategy  # 排序策略
+        # AutoSortStrategy 会记录上次的选择和计数，不能在排序器之间共享
+        self.strategy = strategy if strategy is not None else AutoSortStrategy()  # 排序策略
         self.key = key  # 键函数
         self.reverse = reverse  # 排序顺序
 
@@ -134,24 +668,342 @@ class Sorter:
         """
         return self.strategy.sort(data, self.key, self.reverse)
 
+    def top_k(self, data: Iterable[Any], k: int) -> List[Any]:
+        """
+        只取排序结果的前 k 个元素，结果与 sort(data)[:k] 相同（关键字相等时保持原顺序）。
+        用大小为 k 的堆逐个扫描数据，时间复杂度 O(n log k)，额外空间 O(k)，
+        data 可以是生成器，不需要先把全部数据读入内存。
+
+        :param data: 要排序的数据，任意可迭代对象。
+        :param k: 需要返回的元素个数。
+        :return: 排在最前面的 k 个元素。
+        """
+        if k <= 0:
+            return []
+        # 堆顶是当前保留的 k 个元素中最靠后的一个；关键字相等时下标越大越靠后，
+        # 新元素下标总是最大，所以与堆顶相等时不会替换，保证了稳定性
+        heap = []
+        for index, item in enumerate(data):
+            if self.reverse:
+                entry = (self.key(item), -index, item)
+            else:
+                entry = (_Descending(self.key(item)), -index, item)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif heap[0] < entry:
+                heapq.heapreplace(heap, entry)
+        heap.sort(reverse=True)
+        return [entry[2] for entry in heap]
+
+    def sort_external(
+            self,
+            data: Iterable[Any],
+            chunk_size: int = EXTERNAL_CHUNK_SIZE,
+            workers: Optional[int] = None,
+            temp_dir: Optional[str] = None
+    ) -> Iterator[Any]:
+        """
+        外部排序：按 chunk_size 条一段读取数据，由进程池用当前策略把各段排好序写入临时顺串文件，
+        最后用堆做多路归并，逐条产出排序结果。关键字在主进程中计算，因此 key 可以是 lambda；
+        记录和关键字需要能被 pickle。同时驻留内存的记录约为 (workers + 1) * chunk_size 条。
+        策略稳定时结果也稳定。返回生成器，临时文件在生成器耗尽或关闭时删除。
+
+        :param data: 要排序的数据，任意可迭代对象。
+        :param chunk_size: 每个顺串的记录数。
+        :param workers: 排序进程数，默认为 CPU 核数；为 1 时在当前进程内排序。
+        :param temp_dir: 顺串文件所在目录，默认为系统临时目录。
+        :return: 按顺序产出记录的迭代器。
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须为正数")
+        workers = workers or os.cpu_count() or 1
+        with tempfile.TemporaryDirectory(prefix="sort-runs-", dir=temp_dir) as directory:
+            paths = []
+            source = iter(data)
+            pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            try:
+                pending = deque()
+                while True:
+                    items = list(islice(source, chunk_size))
+                    if not items:
+                        break
+                    keys = [self.key(x) for x in items]
+                    path = os.path.join(directory, f"run{len(paths)}.pkl")
+                    paths.append(path)
+                    if pool is None:
+                        _sort_run(self.strategy, keys, items, self.reverse, path)
+                        continue
+                    # 最多同时提交 workers 段，读数据的速度不会超过排序的速度，内存占用有上限
+                    if len(pending) >= workers:
+                        pending.popleft().result()
+                    pending.append(pool.submit(_sort_run, self.strategy, keys, items, self.reverse, path))
+                    del items, keys
+                for future in pending:
+                    future.result()
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            # 相等关键字取前面的顺串，前面的顺串来自更早的输入，因此归并保持稳定
+            merged = heapq.merge(*(_read_run(path) for path in paths), key=itemgetter(0), reverse=self.reverse)
+            for _, item in merged:
+                yield item
+
+
+def _sort_run(strategy: SortStrategy, keys: List[Any], items: List[Any], reverse: bool, path: str) -> str:
+    """在工作进程中排好一段数据，并把 (关键字, 记录) 写入顺串文件。"""
+    strategy.sort_keys(keys, items, reverse)
+    with open(path, "wb") as f:
+        for start in range(0, len(items), RUN_BATCH_SIZE):
+            batch = list(zip(keys[start:start + RUN_BATCH_SIZE], items[start:start + RUN_BATCH_SIZE]))
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path: str) -> Iterator[Any]:
+    """逐条读出顺串文件中的 (关键字, 记录)。"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def record_key(record) -> Any:
+    """
+    在视图和索引中识别记录的键：可哈希的记录用记录本身（SpotRow 等同一条记录的不同视图相等且哈希相同，
+    因此被识别为同一条），字典等不可哈希的记录用对象身份。
+    """
+    if isinstance(record, dict):
+        return id(record)
+    try:
+        hash(record)
+    except TypeError:
+        return id(record)
+    return record
+
+
+class SortedView:
+    """
+    按 Sorter 的 key 和 reverse 维护的有序视图。初始内容用 Sorter 的策略排一次序，之后记录的关键字变化时
+    （例如某景点游览人数加 1）调用 update，只把这一条记录移到新位置：从原位置出发倍增步长找到目标区间，
+    再在区间内二分，比较次数为 O(log 移动距离)，不需要整体重排。
+    关键字相等的记录按进入视图的先后排列。订阅者在每次变化后收到 (记录, 原位置, 新位置)，
+    新增时原位置为 None，删除时新位置为 None；两个位置之间的记录各移动了一位。
+    记录按 record_key 识别：可哈希的记录按值（例如每次从 SpotTable 取出的新 SpotRow 视图都能找到同一行），
+    字典等按对象身份；同一条记录只能在视图中出现一次。
+    """
+
+    def __init__(self, sorter: Sorter, data: Iterable[Any] = ()):
+        self.key = sorter.key
+        self.reverse = sorter.reverse
+        items = list(data)
+        keys = [self.key(x) for x in items]
+        sorter.strategy.sort_keys(keys, items, self.reverse)
+        self._items = items
+        self._keys = keys
+        # 关键字相等时按序号排列；初始序号取排序后的位置，即使策略不稳定也与当前顺序一致
+        self._seqs = list(range(len(items)))
+        self._meta = {}
+        for seq, (item, k) in enumerate(zip(items, keys)):
+            if record_key(item) in self._meta:
+                raise ValueError(f"同一条记录在视图中出现了两次: {item!r}")
+            self._meta[record_key(item)] = (k, seq)
+        self._next_seq = len(items)
+        self._subscribers = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, item):
+        return record_key(item) in self._meta
+
+    def index(self, item) -> int:
+        """返回记录当前所在的位置。"""
+        k, seq = self._meta[record_key(item)]
+        return self._locate(k, seq)
+
+    def subscribe(self, callback: Callable[[Any, Optional[int], Optional[int]], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Any, Optional[int], Optional[int]], None]) -> None:
+        self._subscribers.remove(callback)
+
+    def add(self, item) -> int:
+        """加入一条新记录，返回它的位置。"""
+        if record_key(item) in self._meta:
+            raise ValueError(f"记录已在视图中: {item!r}")
+        k, seq = self.key(item), self._next_seq
+        self._next_seq += 1
+        index = self._locate(k, seq)
+        self._insert(index, item, k, seq)
+        self._notify(item, None, index)
+        return index
+
+    def remove(self, item) -> int:
+        """移除一条记录，返回它原来的位置。"""
+        k, seq = self._meta.pop(record_key(item))
+        index = self._locate(k, seq)
+        self._pop(index)
+        self._notify(item, index, None)
+        return index
+
+    def update(self, item) -> int:
+        """
+        记录的关键字已经改变（调用方已修改记录本身）时调用，把记录移到新位置并返回新位置。
+        关键字没有变化时不移动，也不通知订阅者。
+        """
+        old_key, seq = self._meta[record_key(item)]
+        new_key = self.key(item)
+        old_index = self._locate(old_key, seq)
+        if new_key == old_key:
+            return old_index
+        self._pop(old_index)
+        new_index = self._locate(new_key, seq, hint=old_index)
+        self._insert(new_index, item, new_key, seq)
+        self._notify(item, old_index, new_index)
+        return new_index
+
+    def _insert(self, index, item, k, seq):
+        self._items.insert(index, item)
+        self._keys.insert(index, k)
+        self._seqs.insert(index, seq)
+        self._meta[record_key(item)] = (k, seq)
+
+    def _pop(self, index):
+        self._keys.pop(index)
+        self._seqs.pop(index)
+        return self._items.pop(index)
+
+    def _notify(self, item, old_index, new_index):
+        for callback in list(self._subscribers):
+            callback(item, old_index, new_index)
+
+    def _before(self, index, k, seq):
+        # 位置 index 上的记录是否排在 (k, seq) 之前
+        other = self._keys[index]
+        if other == k:
+            return self._seqs[index] < seq
+        return other > k if self.reverse else other < k
+
+    def _locate(self, k, seq, hint=None):
+        """返回 (k, seq) 应处的位置，即排在它前面的记录个数；给出 hint 时从 hint 附近开始倍增查找。"""
+        lo, hi = 0, len(self._keys)
+        if hint is not None and lo <= hint < hi:
+            step = 1
+            if self._before(hint, k, seq):
+                lo = probe = hint + 1
+                while probe < hi and self._before(probe, k, seq):
+                    lo = probe + 1
+                    probe += step
+                    step *= 2
+                hi = min(hi, probe)
+            else:
+                hi = probe = hint
+                probe -= 1
+                while probe >= lo and not self._before(probe, k, seq):
+                    hi = probe
+                    probe -= step
+                    step *= 2
+                lo = max(lo, probe + 1)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(mid, k, seq):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class _Descending:
+    """反转关键字大小关系的包装，使 heapq 的最小堆可以当作最大堆使用。"""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
 
 class GrandViewGardenSpot:
     """大观园景点类（包含中文名称、热度、游览人数）"""
+    __slots__ = ("name", "popularity", "visits", "initials")
 
     def __init__(self, name: str, popularity: int, visits: int):
         self.name = name  # 中文地名
         self.popularity = popularity  # 热度评分
         self.visits = visits  # 游览人次
+        self.initials = None  # 拼音首字母，由 precompute_initials 填入
 
     def __repr__(self):
         return f"{self.name}（热度{self.popularity}★ 游览{self.visits}次）"
 
 
-def chinese_to_pinyin_initials(name: str) -> str:
-    """将中文转换为拼音首字母组合（如'怡红院'->'YHY'）"""
+@lru_cache(maxsize=PINYIN_CACHE_SIZE)
+def _pinyin_initials(name: str) -> str:
     return ''.join([p[0].upper() for p in lazy_pinyin(name)])
 
 
+def chinese_to_pinyin_initials(name: str) -> str:
+    """将中文转换为拼音首字母组合（如'怡红院'->'YHY'），结果保存在有界 LRU 缓存中"""
+    return _pinyin_initials(name)
+
+
+def pinyin_cache_info() -> dict:
+    """返回拼音首字母缓存的命中次数、未命中次数、命中率和容量"""
+    info = _pinyin_initials.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / total if total else 0.0,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
+def clear_pinyin_cache() -> None:
+    """清空拼音首字母缓存及其命中统计（如性能测试需要测量冷启动代价时）"""
+    _pinyin_initials.cache_clear()
+
+
+def warm_pinyin_cache(names: Iterable[str]) -> int:
+    """批量预热拼音首字母缓存（如加载整个景点目录时），返回处理的名称个数"""
+    count = 0
+    for name in names:
+        _pinyin_initials(name)
+        count += 1
+    return count
+
+
+def precompute_initials(records: Iterable[Any], field: str = "name", target: str = "initials") -> None:
+    """
+    为每条景点记录预先计算一次拼音首字母并保存在记录上，之后排序可直接使用该字段。
+    字典记录写入 record[target]，对象记录写入同名属性。使用 __slots__ 的类必须声明 target 槽位
+    （GrandViewGardenSpot、ScenicSpot 和 SpotRow 都提供 initials 字段），否则抛出 AttributeError。
+    """
+    for record in records:
+        if isinstance(record, dict):
+            record[target] = chinese_to_pinyin_initials(record[field])
+            continue
+        try:
+            setattr(record, target, chinese_to_pinyin_initials(getattr(record, field)))
+        except AttributeError as e:
+            raise AttributeError(f"{type(record).__name__} 没有可写的 {target} 字段，"
+                                 f"使用 __slots__ 时需声明该槽位") from e
+
+
 if __name__ == "__main__":
     # 测试数据
     spots = [